@@ -5,16 +5,27 @@ from routes.graficos import graficos_bp
 from routes.analise import analise_bp
 from routes.exportar import exportar_bp
 from routes.mapa import mapa_bp
+from routes.aeroportos import aeroportos_bp
+from routes.tarefas import tarefas_bp
+from routes.metricas import metricas_bp
 
-app = Flask(__name__)
+def create_app():
+    app = Flask(__name__)
 
-# Registrar os Blueprints das rotas
-app.register_blueprint(previsao_bp)
-app.register_blueprint(sugerir_rota_bp)
-app.register_blueprint(graficos_bp)
-app.register_blueprint(analise_bp)
-app.register_blueprint(exportar_bp)
-app.register_blueprint(mapa_bp)
+    # Registrar os Blueprints das rotas
+    app.register_blueprint(previsao_bp)
+    app.register_blueprint(sugerir_rota_bp)
+    app.register_blueprint(graficos_bp)
+    app.register_blueprint(analise_bp)
+    app.register_blueprint(exportar_bp)
+    app.register_blueprint(mapa_bp)
+    app.register_blueprint(aeroportos_bp)
+    app.register_blueprint(tarefas_bp)
+    app.register_blueprint(metricas_bp)
+
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Só no modo de desenvolvimento: importar este módulo (wsgi.py, benchmarks) não cria uma aplicação
+    app = create_app()
+    app.run(debug=True)
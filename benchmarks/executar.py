@@ -0,0 +1,343 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from benchmarks import fixtures
+from benchmarks.servidores import ServidorFalso, ColecaoMemoria, responder_meteostat, responder_aeroapi
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CENARIOS = ['previsao', 'sugerir_rota', 'sugerir_rota_recalculo', 'graficos', 'analise', 'exportar_excel', 'mapa_sugerido']
+
+# Uso: python -m benchmarks.executar --saida resultado.json [--base anterior.json]
+
+def preparar_ambiente(args):
+    # Upstreams falsos e diretórios temporários precisam estar no ambiente antes de importar config.py
+    meteostat = ServidorFalso(responder_meteostat, args.latencia_ms / 1000).iniciar()
+    aeroapi = ServidorFalso(responder_aeroapi, args.latencia_ms / 1000).iniciar()
+    diretorio = tempfile.mkdtemp(prefix='benchmark_')
+    os.environ.update({
+        'METEOSTAT_API_URL': f"{meteostat.url}/point/monthly",
+        'AEROAPI_URL': aeroapi.url,
+        'CACHE_DIR': diretorio,
+        'AEROPORTOS_ARQUIVO': os.path.join(diretorio, 'aeroportos.csv'),
+        'PREVISOES_DB': os.path.join(diretorio, 'previsoes.sqlite3'),
+        'TAREFAS_DB': os.path.join(diretorio, 'tarefas.sqlite3'),
+    })
+    if args.mongo_uri:
+        os.environ['MONGO_URI'] = args.mongo_uri
+    return {'meteostat': meteostat, 'aeroapi': aeroapi}, diretorio
+
+
+class RecursosFrios:
+    # Locais e pares de aeroportos ainda não usados: cada amostra fria encontra caches e modelos vazios
+    def __init__(self):
+        self._indice_local = 0
+        self._aeroportos = list(fixtures.AEROPORTOS)
+
+    def local(self):
+        # Grade no hemisfério norte, longe dos aeroportos das fixtures
+        i = self._indice_local
+        self._indice_local += 1
+        return round(5 + 0.37 * i, 4), round(-10 - 0.53 * i, 4)
+
+    def par(self):
+        if len(self._aeroportos) < 2:
+            return None
+        return self._aeroportos.pop(0), self._aeroportos.pop(0)
+
+
+def urls_cenario(nome, recursos, amostras, data):
+    # Devolve as URLs das amostras frias; a primeira é reutilizada nas fases quentes
+    if nome in ('previsao', 'graficos', 'analise', 'exportar_excel'):
+        caminho = {
+            'previsao': "/previsao?lat={lat}&lon={lon}&data={data}",
+            'graficos': "/graficos?lat={lat}&lon={lon}&data={data}&formato=png",
+            'analise': "/analise?lat={lat}&lon={lon}",
+            'exportar_excel': "/exportar_excel?lat={lat}&lon={lon}",
+        }[nome]
+        return [caminho.format(lat=lat, lon=lon, data=data) for lat, lon in (recursos.local() for _ in range(amostras))]
+
+    caminho = {
+        'sugerir_rota': "/sugerir_rota?origem_id={origem}&destino_id={destino}&data={data}",
+        'sugerir_rota_recalculo': "/sugerir_rota?origem_id={origem}&destino_id={destino}&data={data}&reutilizar=false",
+        'mapa_sugerido': "/mapa_sugerido?origem_id={origem}&destino_id={destino}&data={data}",
+    }[nome]
+    urls = []
+    for _ in range(amostras):
+        par = recursos.par()
+        if par is None:
+            break
+        urls.append(caminho.format(origem=par[0], destino=par[1], data=data))
+    return urls
+
+
+def estatisticas(duracoes):
+    if not duracoes:
+        return None
+    ms = np.asarray(duracoes) * 1000
+    return {
+        "amostras": len(ms),
+        "media_ms": round(float(ms.mean()), 2),
+        "min_ms": round(float(ms.min()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p90_ms": round(float(np.percentile(ms, 90)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+def pico_rss_mb():
+    # ru_maxrss em KiB no Linux; os processos do pool do Prophet não entram nesta medida
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class MedidorEtapas:
+    # Diferença dos histogramas de /metrics entre o início e o fim de uma fase
+    def __init__(self):
+        from services.metricas_service import duracao_etapa, duracao_upstream
+        self._histogramas = {'etapa': duracao_etapa, 'upstream': duracao_upstream}
+        self._inicio = None
+
+    def iniciar(self):
+        self._inicio = {nome: histograma.resumo() for nome, histograma in self._histogramas.items()}
+
+    def finalizar(self):
+        resultado = {}
+        for nome, histograma in self._histogramas.items():
+            anterior = self._inicio[nome]
+            agregado = {}
+            for chave, (soma, total) in histograma.resumo().items():
+                soma_anterior, total_anterior = anterior.get(chave, (0.0, 0))
+                if total > total_anterior:
+                    item = agregado.setdefault(chave[0], {"total_ms": 0.0, "chamadas": 0})
+                    item["total_ms"] += (soma - soma_anterior) * 1000
+                    item["chamadas"] += total - total_anterior
+            resultado[nome] = {rotulo: {"total_ms": round(item["total_ms"], 2), "chamadas": item["chamadas"]} for rotulo, item in sorted(agregado.items())}
+        return resultado
+
+
+def requisitar(cliente, url):
+    inicio = time.perf_counter()
+    resposta = cliente.get(url)
+    resposta.get_data()  # consome respostas transmitidas em blocos
+    return time.perf_counter() - inicio, resposta.status_code
+
+def fase(app, urls, medidor):
+    cliente = app.test_client()
+    duracoes, erros = [], 0
+    medidor.iniciar()
+    for url in urls:
+        duracao, status = requisitar(cliente, url)
+        duracoes.append(duracao)
+        erros += status >= 400
+    return {**(estatisticas(duracoes) or {}), "erros": erros, "etapas": medidor.finalizar()}
+
+def fase_concorrente(app, urls, threads, por_thread, medidor):
+    duracoes, erros = [], []
+    lock = threading.Lock()
+
+    def executar(indice):
+        cliente = app.test_client()
+        for i in range(por_thread):
+            duracao, status = requisitar(cliente, urls[(indice + i) % len(urls)])
+            with lock:
+                duracoes.append(duracao)
+                erros.append(status >= 400)
+
+    medidor.iniciar()
+    inicio = time.perf_counter()
+    trabalhadores = [threading.Thread(target=executar, args=(indice,)) for indice in range(threads)]
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    decorrido = time.perf_counter() - inicio
+    return {
+        "threads": threads,
+        "requisicoes": len(duracoes),
+        "vazao_rps": round(len(duracoes) / decorrido, 2),
+        **estatisticas(duracoes),
+        "erros": sum(erros),
+        "etapas": medidor.finalizar(),
+    }
+
+def executar_cenario(app, nome, recursos, args, medidor):
+    urls = urls_cenario(nome, recursos, args.amostras_frias, args.data)
+    if not urls:
+        return {"erro": "Sem recursos frios disponíveis para o cenário."}
+
+    resultado = {}
+    # O recálculo mede o caminho quente sem o cache de sugestões: dados e modelos já existem
+    if nome != 'sugerir_rota_recalculo':
+        print(f"{nome}: frio ({len(urls)} amostras)", file=sys.stderr)
+        resultado["frio"] = fase(app, urls, medidor)
+    else:
+        fase(app, urls, medidor)
+
+    print(f"{nome}: quente ({args.repeticoes} amostras)", file=sys.stderr)
+    resultado["quente"] = fase(app, [urls[0]] * args.repeticoes, medidor)
+
+    print(f"{nome}: concorrência ({args.concorrencia} threads)", file=sys.stderr)
+    resultado["concorrencia"] = fase_concorrente(app, urls, args.concorrencia, args.repeticoes, medidor)
+    resultado["rss_pico_mb"] = pico_rss_mb()
+    return resultado
+
+
+def medir_funcao(funcao, repeticoes, preparar=None):
+    duracoes = []
+    for i in range(repeticoes):
+        argumentos = preparar(i) if preparar else ()
+        inicio = time.perf_counter()
+        funcao(*argumentos)
+        duracoes.append(time.perf_counter() - inicio)
+    return estatisticas(duracoes)
+
+def microbenchmarks(recursos, args):
+    from services.meteostat_service import carregar_dados
+    from services.model_service import treinar_modelo, prever_variavel, registro_prophet
+    from services.registro_modelos import registro_modelos
+
+    resultados = {}
+    repeticoes_frias = max(1, args.amostras_frias)
+
+    print("micro: carregar_dados", file=sys.stderr)
+    local = recursos.local()
+    carregar_dados(*local)
+    resultados["carregar_dados"] = {
+        "frio": medir_funcao(carregar_dados, repeticoes_frias, lambda i: recursos.local()),
+        "quente": medir_funcao(lambda: carregar_dados(*local), args.repeticoes),
+    }
+
+    df = carregar_dados(*local)
+
+    def sem_florestas(i):
+        registro_modelos.invalidar()
+        return (df,)
+
+    print("micro: treinar_modelo", file=sys.stderr)
+    treinar_modelo(df)
+    resultados["treinar_modelo"] = {
+        "frio": medir_funcao(treinar_modelo, repeticoes_frias, sem_florestas),
+        "quente": medir_funcao(lambda: treinar_modelo(df), args.repeticoes),
+    }
+
+    def sem_prophets(i):
+        registro_prophet.invalidar()
+        return (df, 'tavg', args.data)
+
+    print("micro: prever_variavel", file=sys.stderr)
+    prever_variavel(df, 'tavg', args.data)
+    resultados["prever_variavel"] = {
+        "frio": medir_funcao(prever_variavel, repeticoes_frias, sem_prophets),
+        "quente": medir_funcao(lambda: prever_variavel(df, 'tavg', args.data), args.repeticoes),
+    }
+    return resultados
+
+
+def metadados(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "executado_em": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": {chave: valor for chave, valor in vars(args).items() if chave not in ('saida', 'base', 'tolerancia', 'folga_ms')},
+    }
+
+def comparar(base, atual, tolerancia, folga_ms):
+    # Compara p50 e p95 de cada fase (cenários e microbenchmarks) com a execução de referência
+    regressoes = []
+    for grupo in ('cenarios', 'micro'):
+        for nome, fases in atual.get(grupo, {}).items():
+            for nome_fase, valores in fases.items():
+                anterior = base.get(grupo, {}).get(nome, {}).get(nome_fase)
+                if not isinstance(valores, dict) or not isinstance(anterior, dict):
+                    continue
+                for metrica in ('p50_ms', 'p95_ms'):
+                    if metrica not in valores or not anterior.get(metrica):
+                        continue
+                    variacao = valores[metrica] / anterior[metrica] - 1
+                    linha = f"{grupo}/{nome}/{nome_fase} {metrica}: {anterior[metrica]} -> {valores[metrica]} ({variacao:+.0%})"
+                    print(linha, file=sys.stderr)
+                    # A folga absoluta evita alarmes por ruído em medições de poucos milissegundos
+                    if variacao > tolerancia and valores[metrica] - anterior[metrica] > folga_ms:
+                        regressoes.append(linha)
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks das rotas e dos caminhos críticos contra upstreams locais.")
+    parser.add_argument('--cenarios', default=','.join(CENARIOS), help="Cenários separados por vírgula.")
+    parser.add_argument('--amostras-frias', type=int, default=2, help="Amostras frias por cenário (locais ou pares de aeroportos novos).")
+    parser.add_argument('--repeticoes', type=int, default=20, help="Requisições das fases quentes (e por thread na fase concorrente).")
+    parser.add_argument('--concorrencia', type=int, default=8, help="Threads da fase concorrente.")
+    parser.add_argument('--latencia-ms', type=float, default=0, help="Latência simulada dos upstreams falsos.")
+    parser.add_argument('--data', default=(date.today() + timedelta(days=30)).isoformat(), help="Data futura das previsões.")
+    parser.add_argument('--sem-micro', action='store_true', help="Não executa os microbenchmarks.")
+    parser.add_argument('--mongo-uri', help="MongoDB local; sem ele é usada uma coleção em memória.")
+    parser.add_argument('--saida', help="Grava os resultados em JSON neste arquivo.")
+    parser.add_argument('--base', help="Resultados JSON anteriores para comparação.")
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="Regressão máxima aceita em p50/p95 (fração).")
+    parser.add_argument('--folga-ms', type=float, default=5, help="Aumento absoluto mínimo (ms) para contar como regressão.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    for nome in ('cmdstanpy', 'prophet'):
+        logging.getLogger(nome).setLevel(logging.WARNING)
+    servidores, diretorio = preparar_ambiente(args)
+
+    from app import create_app
+    from services.mongo_service import definir_colecao, escritor_sugestoes
+
+    if not args.mongo_uri:
+        definir_colecao(ColecaoMemoria())
+    app = create_app()
+    recursos = RecursosFrios()
+    medidor = MedidorEtapas()
+
+    resultados = {"metadados": metadados(args), "cenarios": {}, "micro": {}}
+    inicio = time.perf_counter()
+    for nome in [nome.strip() for nome in args.cenarios.split(',') if nome.strip()]:
+        if nome not in CENARIOS:
+            raise SystemExit(f"Cenário desconhecido: {nome}. Use um de: {', '.join(CENARIOS)}.")
+        resultados["cenarios"][nome] = executar_cenario(app, nome, recursos, args, medidor)
+    if not args.sem_micro:
+        resultados["micro"] = microbenchmarks(recursos, args)
+
+    escritor_sugestoes.descarregar()
+    resultados["duracao_total_s"] = round(time.perf_counter() - inicio, 1)
+    resultados["rss_pico_mb"] = pico_rss_mb()
+    resultados["requisicoes_upstream"] = {nome: servidor.requisicoes for nome, servidor in servidores.items()}
+    for servidor in servidores.values():
+        servidor.encerrar()
+    shutil.rmtree(diretorio, ignore_errors=True)
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    if args.base:
+        with open(args.base) as f:
+            regressoes = comparar(json.load(f), resultados, args.tolerancia, args.folga_ms)
+        if regressoes:
+            raise SystemExit("Regressão de desempenho:\n" + "\n".join(regressoes))
+
+if __name__ == '__main__':
+    main()
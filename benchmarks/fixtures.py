@@ -0,0 +1,63 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Respostas gravadas da AeroAPI (campos usados pela aplicação) para os aeroportos dos benchmarks
+AEROPORTOS = {
+    'SBGR': {"code_icao": "SBGR", "code_iata": "GRU", "name": "Guarulhos - Governador André Franco Montoro", "latitude": -23.435556, "longitude": -46.473056},
+    'SBRJ': {"code_icao": "SBRJ", "code_iata": "SDU", "name": "Santos Dumont", "latitude": -22.910461, "longitude": -43.163133},
+    'SBSP': {"code_icao": "SBSP", "code_iata": "CGH", "name": "Congonhas", "latitude": -23.626111, "longitude": -46.656389},
+    'SBKP': {"code_icao": "SBKP", "code_iata": "VCP", "name": "Viracopos", "latitude": -23.007404, "longitude": -47.134502},
+    'SBBR': {"code_icao": "SBBR", "code_iata": "BSB", "name": "Presidente Juscelino Kubitschek", "latitude": -15.869167, "longitude": -47.920833},
+    'SBGL': {"code_icao": "SBGL", "code_iata": "GIG", "name": "Galeão - Antonio Carlos Jobim", "latitude": -22.809999, "longitude": -43.250557},
+    'SBCF': {"code_icao": "SBCF", "code_iata": "CNF", "name": "Tancredo Neves", "latitude": -19.624444, "longitude": -43.971944},
+    'SBPA': {"code_icao": "SBPA", "code_iata": "POA", "name": "Salgado Filho", "latitude": -29.994444, "longitude": -51.171111},
+    'SBSV': {"code_icao": "SBSV", "code_iata": "SSA", "name": "Deputado Luís Eduardo Magalhães", "latitude": -12.908611, "longitude": -38.3225},
+    'SBRF': {"code_icao": "SBRF", "code_iata": "REC", "name": "Guararapes - Gilberto Freyre", "latitude": -8.126389, "longitude": -34.923611},
+    'SBFZ': {"code_icao": "SBFZ", "code_iata": "FOR", "name": "Pinto Martins", "latitude": -3.776111, "longitude": -38.5325},
+    'SBCT': {"code_icao": "SBCT", "code_iata": "CWB", "name": "Afonso Pena", "latitude": -25.528475, "longitude": -49.175775},
+    'SBFL': {"code_icao": "SBFL", "code_iata": "FLN", "name": "Hercílio Luz", "latitude": -27.670278, "longitude": -48.5525},
+    'SBBE': {"code_icao": "SBBE", "code_iata": "BEL", "name": "Val de Cans", "latitude": -1.379722, "longitude": -48.476111},
+    'SBEG': {"code_icao": "SBEG", "code_iata": "MAO", "name": "Eduardo Gomes", "latitude": -3.038611, "longitude": -60.049722},
+    'SBGO': {"code_icao": "SBGO", "code_iata": "GYN", "name": "Santa Genoveva", "latitude": -16.6325, "longitude": -49.221111},
+}
+
+def rotas(origem, destino):
+    return {
+        "routes": [
+            {
+                "aircraft_types": ["A320", "B738"],
+                "filed_altitude_min": 33000,
+                "filed_altitude_max": 39000,
+                "route_distance": "230 nm",
+                "last_departure_time": "2024-10-31T21:15:00Z",
+                "route": f"{origem} DCT {destino}",
+            }
+        ]
+    }
+
+def _semente(lat, lon):
+    # Mesma célula, mesma série: a semente depende só das coordenadas arredondadas
+    texto = f"{round(lat, 2):.2f}_{round(lon, 2):.2f}"
+    return int(hashlib.sha1(texto.encode()).hexdigest()[:8], 16)
+
+def meteostat_mensal(lat, lon, inicio, fim):
+    # Série mensal determinística: sazonalidade anual mais ruído fixo por local e mês
+    meses = pd.date_range(pd.Timestamp(inicio).replace(day=1), fim, freq='MS')
+    linhas = []
+    for mes in meses:
+        rng = np.random.default_rng([_semente(lat, lon), mes.year, mes.month])
+        sazonal = np.cos(2 * np.pi * (mes.month - 1) / 12)
+        tavg = 22 - abs(lat) * 0.2 + 5 * sazonal + rng.normal(0, 1.5)
+        linhas.append({
+            "date": mes.strftime('%Y-%m-%d'),
+            "tavg": round(tavg, 1),
+            "tmin": round(tavg - 5 - rng.uniform(0, 2), 1),
+            "tmax": round(tavg + 6 + rng.uniform(0, 8), 1),
+            "prcp": round(max(0.0, 120 + 90 * sazonal + rng.normal(0, 40)), 1),
+            "wspd": round(abs(10 + rng.normal(0, 6)), 1),
+            "pres": round(1013 - 3 * sazonal + rng.normal(0, 2), 1),
+            "tsun": None,
+        })
+    return {"meta": {"generated": "benchmark"}, "data": linhas}
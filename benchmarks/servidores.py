@@ -0,0 +1,114 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from benchmarks import fixtures
+
+
+class ServidorFalso:
+    # Servidor HTTP local (porta livre) que responde com as fixtures, com latência opcional por requisição
+    def __init__(self, responder, latencia=0.0):
+        servidor = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                partes = urlsplit(self.path)
+                parametros = {nome: valores[0] for nome, valores in parse_qs(partes.query).items()}
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                with servidor._lock:
+                    servidor.requisicoes += 1
+                status, corpo = responder(partes.path, parametros)
+                dados = json.dumps(corpo).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, *args):
+                pass
+
+        self.latencia = latencia
+        self.requisicoes = 0
+        self._lock = threading.Lock()
+        self._http = ThreadingHTTPServer(('127.0.0.1', 0), Manipulador)
+        self._http.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._http.server_address[1]}"
+
+    def iniciar(self):
+        threading.Thread(target=self._http.serve_forever, daemon=True, name='servidor_falso').start()
+        return self
+
+    def encerrar(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+def responder_meteostat(caminho, parametros):
+    if caminho != '/point/monthly':
+        return 404, {"message": "not found"}
+    try:
+        lat, lon = float(parametros['lat']), float(parametros['lon'])
+        return 200, fixtures.meteostat_mensal(lat, lon, parametros['start'], parametros['end'])
+    except (KeyError, ValueError):
+        return 400, {"message": "invalid parameters"}
+
+def responder_aeroapi(caminho, parametros):
+    rota = re.fullmatch(r'/airports/(\w+)/routes/(\w+)', caminho)
+    if rota:
+        return 200, fixtures.rotas(*rota.groups())
+    aeroporto = re.fullmatch(r'/airports/(\w+)', caminho)
+    if aeroporto and aeroporto.group(1).upper() in fixtures.AEROPORTOS:
+        return 200, fixtures.AEROPORTOS[aeroporto.group(1).upper()]
+    return 404, {"title": "Not Found"}
+
+
+class ColecaoMemoria:
+    # Substituto em memória da coleção do MongoDB com o subconjunto usado por services/mongo_service.py
+    OPERADORES = {
+        '$gte': lambda valor, limite: valor >= limite,
+        '$gt': lambda valor, limite: valor > limite,
+        '$lte': lambda valor, limite: valor <= limite,
+        '$lt': lambda valor, limite: valor < limite,
+    }
+
+    def __init__(self):
+        self._documentos = []
+        self._lock = threading.Lock()
+
+    def create_index(self, chaves, **opcoes):
+        return opcoes.get('name')
+
+    def insert_one(self, documento):
+        with self._lock:
+            self._documentos.append(dict(documento))
+
+    def insert_many(self, documentos, ordered=True):
+        with self._lock:
+            self._documentos.extend(dict(documento) for documento in documentos)
+
+    def find_one(self, filtro=None, sort=None):
+        with self._lock:
+            encontrados = [documento for documento in self._documentos if self._corresponde(documento, filtro or {})]
+        for campo, direcao in reversed(sort or []):
+            encontrados.sort(key=lambda documento: documento[campo], reverse=direcao < 0)
+        return dict(encontrados[0]) if encontrados else None
+
+    def count_documents(self, filtro):
+        with self._lock:
+            return sum(1 for documento in self._documentos if self._corresponde(documento, filtro))
+
+    def _corresponde(self, documento, filtro):
+        for campo, condicao in filtro.items():
+            if campo not in documento:
+                return False
+            if isinstance(condicao, dict):
+                if not all(self.OPERADORES[operador](documento[campo], limite) for operador, limite in condicao.items()):
+                    return False
+            elif documento[campo] != condicao:
+                return False
+        return True
@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -5,21 +6,146 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Configurações da API Meteostat
-API_URL = "https://meteostat.p.rapidapi.com/point/monthly"
+API_URL = os.getenv("METEOSTAT_API_URL", "https://meteostat.p.rapidapi.com/point/monthly")
 HEADERS = {
     "X-RapidAPI-Key": os.getenv("METEOSTAT_API_KEY"),
     "X-RapidAPI-Host": os.getenv("METEOSTAT_API_HOST")
 }
 
 # Configurações da API AeroAPI
-AERO_API_URL = "https://aeroapi.flightaware.com/aeroapi"
+AERO_API_URL = os.getenv("AEROAPI_URL", "https://aeroapi.flightaware.com/aeroapi")
 AEROAPI_HEADERS = {
     "x-apikey": os.getenv("AEROAPI_KEY"),
 }
 
+# Configurações do MongoDB (sugestões de rota)
+MONGO_URI = os.getenv('MONGO_URI')
+MONGO_DB = os.getenv('MONGOD_DATASET')
+MONGO_COLLECTION = os.getenv('MONGO_COLLECTION')
+MONGO_POOL_MAX = int(os.getenv("MONGO_POOL_MAX", 50))
+MONGO_POOL_MIN = int(os.getenv("MONGO_POOL_MIN", 0))
+MONGO_IDLE_MS = int(os.getenv("MONGO_IDLE_MS", 60000))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", 5000))
+MONGO_LOTE = int(os.getenv("MONGO_LOTE", 100))
+MONGO_INTERVALO_SEGUNDOS = float(os.getenv("MONGO_INTERVALO_SEGUNDOS", 1.0))
+MONGO_BUFFER_MAX = int(os.getenv("MONGO_BUFFER_MAX", 10000))
+MONGO_ESPERA_BUFFER_SEGUNDOS = float(os.getenv("MONGO_ESPERA_BUFFER_SEGUNDOS", 0.5))
+# Após uma falha de leitura, o cache de sugestões no MongoDB é ignorado por este tempo (evita esperar o timeout a cada requisição)
+MONGO_PAUSA_LEITURA_SEGUNDOS = float(os.getenv("MONGO_PAUSA_LEITURA_SEGUNDOS", 30))
+
+# Ingestão do Meteostat: início do histórico, tamanho dos blocos do backfill, requisições paralelas
+# e meses já armazenados que são baixados de novo a cada atualização (revisões tardias do Meteostat)
+METEOSTAT_INICIO = os.getenv("METEOSTAT_INICIO", "2018-01-01")
+METEOSTAT_BLOCO_MESES = int(os.getenv("METEOSTAT_BLOCO_MESES", 24))
+METEOSTAT_CONCORRENCIA = int(os.getenv("METEOSTAT_CONCORRENCIA", 4))
+METEOSTAT_SOBREPOSICAO_MESES = int(os.getenv("METEOSTAT_SOBREPOSICAO_MESES", 1))
+
+# Grade espacial: coordenadas próximas caem na mesma célula e compartilham dados, modelos e previsões.
+# "grade" usa células de GRADE_RESOLUCAO graus; "geohash" usa células de GRADE_GEOHASH_PRECISAO caracteres
+GRADE_TIPO = os.getenv("GRADE_TIPO", "grade")
+GRADE_RESOLUCAO = float(os.getenv("GRADE_RESOLUCAO", 0.1))
+GRADE_GEOHASH_PRECISAO = int(os.getenv("GRADE_GEOHASH_PRECISAO", 5))
+
+# Configurações do cache local de séries do Meteostat
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+# Validade da série local: vencida, ela é atualizada de forma incremental (só os meses novos)
+CACHE_TTL_SEGUNDOS = int(os.getenv("CACHE_TTL_SEGUNDOS", 24 * 3600))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 512 * 1024 * 1024))
+CACHE_MAX_MEMORIA = int(os.getenv("CACHE_MAX_MEMORIA", 256))
+CACHE_DTYPE = os.getenv("CACHE_DTYPE", "float32")
+
+# Configurações do registro de modelos treinados
+MODELOS_DIR = os.getenv("MODELOS_DIR", os.path.join(CACHE_DIR, "modelos"))
+MODELOS_MAX_MEMORIA = int(os.getenv("MODELOS_MAX_MEMORIA", 128))
+# A impressão digital muda a cada mês anexado à série: os arquivos antigos são descartados por tamanho (LRU)
+MODELOS_MAX_BYTES = int(os.getenv("MODELOS_MAX_BYTES", 512 * 1024 * 1024))
+PROPHET_DIR = os.getenv("PROPHET_DIR", os.path.join(CACHE_DIR, "prophet"))
+PROPHET_MAX_MEMORIA = int(os.getenv("PROPHET_MAX_MEMORIA", 768))
+PROPHET_MAX_BYTES = int(os.getenv("PROPHET_MAX_BYTES", 512 * 1024 * 1024))
+AVALIACOES_DIR = os.getenv("AVALIACOES_DIR", os.path.join(CACHE_DIR, "avaliacoes"))
+AVALIACOES_MAX_MEMORIA = int(os.getenv("AVALIACOES_MAX_MEMORIA", 128))
+AVALIACOES_MAX_BYTES = int(os.getenv("AVALIACOES_MAX_BYTES", 128 * 1024 * 1024))
+AVALIACAO_N_JOBS = int(os.getenv("AVALIACAO_N_JOBS", -1))
+
+# Configurações do executor paralelo de previsões (0 workers = modo serial)
+PREVISAO_WORKERS = int(os.getenv("PREVISAO_WORKERS", min(6, os.cpu_count() or 1)))
+PREVISAO_TIMEOUT = float(os.getenv("PREVISAO_TIMEOUT", 120))
+PREVISAO_CONTEXTO = os.getenv("PREVISAO_CONTEXTO", "forkserver")
+
+# Motor de previsão das variáveis climáticas ("prophet" ou "harmonico"), ordem das harmônicas anuais
+# do modelo harmônico e largura dos intervalos de previsão (a mesma do padrão do Prophet)
+MODELO_PREVISAO = os.getenv("MODELO_PREVISAO", "prophet").strip().lower()
+HARMONICO_ORDEM = int(os.getenv("HARMONICO_ORDEM", 3))
+INTERVALO_PREVISAO = float(os.getenv("INTERVALO_PREVISAO", 0.8))
+
+# Backtest dos modelos (python -m services.backtest_service): meses previstos por origem e origens por série
+BACKTEST_HORIZONTE_MESES = int(os.getenv("BACKTEST_HORIZONTE_MESES", 12))
+BACKTEST_ORIGENS = int(os.getenv("BACKTEST_ORIGENS", 3))
+
+# Índice local de aeroportos (ICAO/IATA -> coordenadas)
+AEROPORTOS_ARQUIVO = os.getenv("AEROPORTOS_ARQUIVO", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "aeroportos.csv"))
+
+# Cache de gráficos renderizados (número de imagens em memória)
+GRAFICOS_MAX_MEMORIA = int(os.getenv("GRAFICOS_MAX_MEMORIA", 256))
+
+# Previsões pré-calculadas pelo agendador (worker.py)
+PREVISOES_DB = os.getenv("PREVISOES_DB", os.path.join(CACHE_DIR, "previsoes.sqlite3"))
+PREVISOES_VALIDADE_SEGUNDOS = int(os.getenv("PREVISOES_VALIDADE_SEGUNDOS", 24 * 3600))
+AGENDADOR_AEROPORTOS = [codigo.strip() for codigo in os.getenv("AGENDADOR_AEROPORTOS", "").split(',') if codigo.strip()]
+AGENDADOR_CELULAS = os.getenv("AGENDADOR_CELULAS", "")
+AGENDADOR_HORIZONTE_DIAS = int(os.getenv("AGENDADOR_HORIZONTE_DIAS", 30))
+AGENDADOR_INTERVALO_SEGUNDOS = int(os.getenv("AGENDADOR_INTERVALO_SEGUNDOS", 6 * 3600))
+AGENDADOR_CONCORRENCIA = int(os.getenv("AGENDADOR_CONCORRENCIA", 2))
+
+# Configurações do cliente HTTP compartilhado (timeouts em segundos)
+HTTP_TIMEOUT_CONEXAO = float(os.getenv("HTTP_TIMEOUT_CONEXAO", 5))
+HTTP_TIMEOUT_LEITURA = float(os.getenv("HTTP_TIMEOUT_LEITURA", 30))
+HTTP_TENTATIVAS = int(os.getenv("HTTP_TENTATIVAS", 3))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 30))
+HTTP_POOL_MAX = int(os.getenv("HTTP_POOL_MAX", 20))
+
+# Pools de threads separados para trabalho de CPU (ajustes/previsões) e de I/O (upstreams)
+EXECUTOR_CPU_THREADS = int(os.getenv("EXECUTOR_CPU_THREADS", os.cpu_count() or 1))
+EXECUTOR_IO_THREADS = int(os.getenv("EXECUTOR_IO_THREADS", 32))
+
+# Tarefas assíncronas (/jobs): armazenamento ("memoria" ou "sqlite"), workers locais e validade dos resultados
+TAREFAS_ARMAZEM = os.getenv("TAREFAS_ARMAZEM", "memoria")
+TAREFAS_DB = os.getenv("TAREFAS_DB", os.path.join(CACHE_DIR, "tarefas.sqlite3"))
+TAREFAS_WORKERS = int(os.getenv("TAREFAS_WORKERS", 4))
+TAREFAS_MAX_PENDENTES = int(os.getenv("TAREFAS_MAX_PENDENTES", 100))
+TAREFAS_TTL_SEGUNDOS = int(os.getenv("TAREFAS_TTL_SEGUNDOS", 3600))
+
+# Métricas (/metrics): limites dos baldes dos histogramas (segundos) e cabeçalho Server-Timing nas respostas
+METRICAS_BALDES = [float(valor) for valor in os.getenv("METRICAS_BALDES", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60").split(',')]
+METRICAS_SERVER_TIMING = os.getenv("METRICAS_SERVER_TIMING", "false").lower() == "true"
+
+# Cache de resultados de /sugerir_rota
+ROTA_CACHE_MAX = int(os.getenv("ROTA_CACHE_MAX", 1024))
+ROTA_CACHE_TTL_SEGUNDOS = int(os.getenv("ROTA_CACHE_TTL_SEGUNDOS", 6 * 3600))
+# Pontos intermediários avaliados no grande círculo entre origem e destino (0 avalia só as pontas).
+# Cada célula nova do corredor custa uma série do Meteostat e um ajuste por variável com limite de risco
+CORREDOR_PONTOS = int(os.getenv("CORREDOR_PONTOS", 3))
+
+# Previsão em lote: limite de itens por requisição
+LOTE_MAX_ITENS = int(os.getenv("LOTE_MAX_ITENS", 10000))
+
+# Exportação em streaming: tamanho dos blocos e limite de blocos pendentes (memória máxima por download)
+EXPORTAR_LINHAS_POR_BLOCO = int(os.getenv("EXPORTAR_LINHAS_POR_BLOCO", 5000))
+EXPORTAR_BYTES_POR_BLOCO = int(os.getenv("EXPORTAR_BYTES_POR_BLOCO", 64 * 1024))
+EXPORTAR_MAX_BLOCOS_FILA = int(os.getenv("EXPORTAR_MAX_BLOCOS_FILA", 16))
+EXPORTAR_MAX_LOCAIS = int(os.getenv("EXPORTAR_MAX_LOCAIS", 50))
+
 # Mensagens e constantes
 HISTORICAL_LABEL = 'Dados Históricos'
 FUTURE_DATE_LABEL = 'Data Futura'
 PREDICTION_LABEL = 'Previsão'
 TEMPERATURE_UNIT = 'Temperatura (°C)'
 DATE_FORMAT_MSG = 'Formato de data inválido. Use YYYY-MM-DD.'
+COLUNAS_CLIMA = ['tavg', 'tmin', 'tmax', 'prcp', 'wspd', 'pres']
+# Grandezas físicas sem valores negativos: previsões e intervalos são cortados em 0
+COLUNAS_NAO_NEGATIVAS = ['prcp', 'wspd']
+
+# Regras de risco: o mês é de alto risco se qualquer coluna ultrapassar o seu limite
+LIMITES_RISCO = json.loads(os.getenv("LIMITES_RISCO", '{"tmax": 35, "prcp": 50, "wspd": 25}'))
+JANELAS_MEDIAS_MOVEIS = [3, 12]
@@ -0,0 +1,20 @@
+import os
+
+# Servidor de produção: gunicorn -c gunicorn.conf.py wsgi:app
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", os.cpu_count() or 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+
+# Importa a aplicação (e as bibliotecas pesadas) uma vez no mestre antes do fork dos workers
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+def post_fork(server, worker):
+    from wsgi import reiniciar_recursos
+    reiniciar_recursos()
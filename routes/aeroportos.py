@@ -0,0 +1,21 @@
+from flask import Blueprint, request, jsonify
+from services.aeroporto_index import indice_aeroportos
+
+aeroportos_bp = Blueprint('aeroportos', __name__)
+
+@aeroportos_bp.route('/aeroportos/proximos', methods=['GET'])
+def aeroportos_proximos():
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    k = request.args.get('k', default=1, type=int)
+
+    if lat is None or lon is None:
+        return jsonify({"erro": "Os parâmetros 'lat' e 'lon' são obrigatórios."}), 400
+
+    try:
+        return jsonify({
+            "localizacao": {"latitude": lat, "longitude": lon},
+            "aeroportos": indice_aeroportos.mais_proximos(lat, lon, max(1, k))
+        })
+    except Exception as e:
+        return jsonify({"erro": str(e)}), 500
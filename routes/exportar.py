@@ -1,32 +1,58 @@
-from flask import Blueprint, request, jsonify, send_file
-import pandas as pd
-import io
+from flask import Blueprint, request, jsonify, Response
 from services.meteostat_service import carregar_dados
+from services.exportar_service import FORMATOS, formato_disponivel, nome_arquivo, exportar_local, exportar_locais
+from config import EXPORTAR_MAX_LOCAIS
 
 exportar_bp = Blueprint('exportar', __name__)
 
+def ler_locais(valor):
+    # Formato: "lat,lon;lat,lon"
+    locais = []
+    for par in valor.split(';'):
+        if par.strip():
+            lat, lon = par.split(',')
+            locais.append((float(lat), float(lon)))
+    return locais
+
 @exportar_bp.route('/exportar_excel', methods=['GET'])
+@exportar_bp.route('/exportar', methods=['GET'])
 def exportar_excel():
     lat = request.args.get('lat', type=float)
     lon = request.args.get('lon', type=float)
+    locais = request.args.get('locais')
+    formato = request.args.get('format', default='xlsx').lower()
+    features = request.args.get('features', default='false').lower() == 'true'
+
+    if formato not in FORMATOS:
+        return jsonify({"erro": f"Formato inválido. Use um de: {', '.join(FORMATOS)}."}), 400
+    if not formato_disponivel(formato):
+        return jsonify({"erro": f"O formato '{formato}' requer dependências não instaladas."}), 400
+
+    if locais:
+        try:
+            locais = ler_locais(locais)
+        except ValueError:
+            return jsonify({"erro": "O parâmetro 'locais' deve seguir o formato 'lat,lon;lat,lon'."}), 400
+        if not locais or len(locais) > EXPORTAR_MAX_LOCAIS:
+            return jsonify({"erro": f"Informe entre 1 e {EXPORTAR_MAX_LOCAIS} locais."}), 400
+
+        return Response(
+            exportar_locais(locais, formato, features=features),
+            mimetype='application/zip',
+            headers={"Content-Disposition": f"attachment; filename=dados_meteorologicos_{formato}.zip"}
+        )
 
     if not lat or not lon:
         return jsonify({"erro": "Os parâmetros 'lat' e 'lon' são obrigatórios."}), 400
 
     try:
-        df = carregar_dados(lat, lon)
-        output = io.BytesIO()
-
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=True, sheet_name='Dados')
-
-        output.seek(0)
+        df = carregar_dados(lat, lon, features=features)
+        nome = 'dados_meteorologicos.xlsx' if formato == 'xlsx' else nome_arquivo(lat, lon, formato)
 
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name='dados_meteorologicos.xlsx'
+        return Response(
+            exportar_local(df, formato),
+            mimetype=FORMATOS[formato][0],
+            headers={"Content-Disposition": f"attachment; filename={nome}"}
         )
 
     except Exception as e:
@@ -1,11 +1,9 @@
-from flask import Blueprint, request, jsonify, send_file
-import pandas as pd
-import matplotlib.pyplot as plt
-import io
+from flask import Blueprint, request, jsonify, Response
 from datetime import datetime
 from services.meteostat_service import carregar_dados
-from services.model_service import prever_variavel
-from config import HISTORICAL_LABEL, FUTURE_DATE_LABEL, PREDICTION_LABEL, TEMPERATURE_UNIT
+from services.model_service import prever_variaveis, validar_modelo
+from services.grafico_service import FORMATOS_GRAFICO, chave_grafico, etag_grafico, obter_ou_renderizar, renderizar_previsao
+from config import COLUNAS_CLIMA
 
 graficos_bp = Blueprint('graficos', __name__)
 
@@ -14,40 +12,34 @@ def graficos():
     data_futura = request.args.get('data')
     lat = request.args.get('lat', type=float)
     lon = request.args.get('lon', type=float)
+    formato = request.args.get('formato', default='png').lower()
 
     if not lat or not lon or not data_futura:
         return jsonify({"erro": "Os parâmetros 'lat', 'lon' e 'data' são obrigatórios."}), 400
+    if formato not in FORMATOS_GRAFICO:
+        return jsonify({"erro": f"Formato inválido. Use um de: {', '.join(FORMATOS_GRAFICO)}."}), 400
+    try:
+        modelo = validar_modelo(request.args.get('modelo'))
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
 
     try:
         datetime.strptime(data_futura, '%Y-%m-%d')
         df = carregar_dados(lat, lon)
 
-        previsoes = {coluna: prever_variavel(df, coluna, data_futura) for coluna in ['tavg', 'tmin', 'tmax', 'prcp', 'wspd', 'pres']}
-
-        fig, axes = plt.subplots(3, 2, figsize=(15, 10)) 
-        axes = axes.flatten()
-
-        colunas = ['tavg', 'tmin', 'tmax', 'prcp', 'wspd', 'pres']
-        unidades = [TEMPERATURE_UNIT, TEMPERATURE_UNIT, TEMPERATURE_UNIT, 'Precipitação (mm)', 'Velocidade do Vento (m/s)', 'Pressão (hPa)']
-
-        for i, (coluna, unidade) in enumerate(zip(colunas, unidades)):
-            ax = axes[i]
-            ax.plot(df.index, df[coluna], label=HISTORICAL_LABEL)
-            ax.axvline(pd.to_datetime(data_futura), color='red', linestyle='--', label=FUTURE_DATE_LABEL)
-            ax.scatter(pd.to_datetime(data_futura), previsoes[coluna], color='green', label=PREDICTION_LABEL)
-            ax.set_title(coluna.upper())
-            ax.set_xlabel('Data')
-            ax.set_ylabel(unidade)
-            ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
-
-        plt.tight_layout()
+        # O ETag depende só dos dados e parâmetros: o cliente que já tem a imagem não paga a previsão
+        chave = chave_grafico('graficos', df, data_futura, formato, modelo=modelo)
+        etag = etag_grafico(chave)
+        if request.if_none_match.contains(etag):
+            resposta = Response(status=304)
+            resposta.set_etag(etag)
+            return resposta
 
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight')
-        buf.seek(0)
-        plt.close()
+        conteudo = obter_ou_renderizar(chave, lambda: renderizar_previsao(df, prever_variaveis(df, COLUNAS_CLIMA, data_futura, modelo=modelo), data_futura, formato))
 
-        return send_file(buf, mimetype='image/png')
+        resposta = Response(conteudo, mimetype=FORMATOS_GRAFICO[formato])
+        resposta.set_etag(etag)
+        return resposta
 
     except Exception as e:
         return jsonify({"erro": str(e)}), 500
@@ -1,11 +1,7 @@
-from flask import Blueprint, request, jsonify, send_file
-import folium
-from io import BytesIO
-from folium.plugins import AntPath
-import requests
-from config import AERO_API_URL, AEROAPI_HEADERS
-import math
-import json
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+from services.rota_service import sugerir_rota
+from services.model_service import validar_modelo
 
 mapa_bp = Blueprint('mapa', __name__)
 
@@ -17,17 +13,19 @@ def mostrar_mapa_sugerido_animado_html():
 
     if not origem_id or not destino_id or not data_futura:
         return jsonify({"erro": "Os parâmetros 'origem_id', 'destino_id' e 'data' são obrigatórios."}), 400
+    try:
+        modelo = validar_modelo(request.args.get('modelo'))
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
 
     try:
-        # Chamar o endpoint /sugerir_rota internamente
-        sugestao_url = f"http://localhost:5000/sugerir_rota?origem_id={origem_id}&destino_id={destino_id}&data={data_futura}"
-        response = requests.get(sugestao_url)
-        sugestao_data = response.json()
+        import folium
+
+        datetime.strptime(data_futura, '%Y-%m-%d')
 
-        if response.status_code != 200:
-            return jsonify({"erro": "Erro ao obter sugestão de rota."}), 500
+        # Calcular a sugestão de rota no próprio processo, reaproveitando as coordenadas já obtidas
+        sugestao_data = sugerir_rota(origem_id, destino_id, data_futura, modelo=modelo)
 
-        # Extrair as coordenadas da sugestão de rota
         origem = sugestao_data['origem']
         destino = sugestao_data['destino']
         rotas = sugestao_data['rotas']
@@ -35,9 +33,10 @@ def mostrar_mapa_sugerido_animado_html():
         risco_destino = sugestao_data['risco_destino']
         sugestao = sugestao_data['sugestao']
 
-        # Obter coordenadas dos aeroportos
-        lat_origem, lon_origem = obter_coordenadas_aeroporto(origem)
-        lat_destino, lon_destino = obter_coordenadas_aeroporto(destino)
+        lat_origem = sugestao_data['coordenadas']['origem']['latitude']
+        lon_origem = sugestao_data['coordenadas']['origem']['longitude']
+        lat_destino = sugestao_data['coordenadas']['destino']['latitude']
+        lon_destino = sugestao_data['coordenadas']['destino']['longitude']
 
         # Criar o mapa
         mapa = folium.Map(location=[lat_origem, lon_origem], zoom_start=5)
@@ -78,6 +77,16 @@ def mostrar_mapa_sugerido_animado_html():
             popup=folium.Popup(f"Rota de {origem} para {destino}")
         ).add_to(mapa)
 
+        # Perfil de risco ao longo do grande círculo, um trecho por segmento
+        cores_risco = {"Alto": 'red', "Baixo": 'green'}
+        for segmento in sugestao_data.get('perfil_rota', []):
+            folium.PolyLine(
+                [[segmento['inicio']['latitude'], segmento['inicio']['longitude']], [segmento['fim']['latitude'], segmento['fim']['longitude']]],
+                color=cores_risco.get(segmento['risco'], 'gray'),
+                weight=3,
+                tooltip=f"Segmento {segmento['segmento']}: risco {segmento['risco']}"
+            ).add_to(mapa)
+
         # Adicionar informações sobre as rotas
         for rota in rotas['routes']:
             # Criar um popup com detalhes da rota
@@ -99,11 +108,3 @@ def mostrar_mapa_sugerido_animado_html():
 
     except Exception as e:
         return jsonify({"erro": str(e)}), 500
-
-def obter_coordenadas_aeroporto(aeroporto_id):
-    url = f"{AERO_API_URL}/airports/{aeroporto_id}"
-    response = requests.get(url, headers=AEROAPI_HEADERS)
-    if response.status_code == 200:
-        data = response.json()
-        return data['latitude'], data['longitude']
-    raise ValueError(f"Erro ao obter coordenadas do aeroporto {aeroporto_id}: {response.status_code}")
\ No newline at end of file
@@ -0,0 +1,117 @@
+import time
+
+from flask import Blueprint, Response, request, g
+from services.metricas_service import (
+    formatar, exportar, iniciar_requisicao, encerrar_requisicao, tempos_requisicao, duracao_requisicao, requisicoes_em_andamento
+)
+from services.cache_service import cache_series
+from services.registro_modelos import registro_modelos
+from services.model_service import registro_prophet
+from services.avaliacao_service import registro_avaliacoes
+from services.grafico_service import cache_graficos
+from services.rota_service import cache_riscos_corredor, cache_sugestoes, chamada_sugestao
+from services.http_client import cliente_http
+from services.tarefas_service import gerenciador_tarefas
+from services.mongo_service import escritor_sugestoes, leituras_sugestoes
+from config import METRICAS_SERVER_TIMING
+
+metricas_bp = Blueprint('metricas', __name__)
+
+# Medição de todas as requisições da aplicação (ganchos registrados pelo blueprint)
+
+def _rota():
+    # Usa o padrão da rota (ex.: /jobs/<tarefa_id>) para não criar uma série por URL
+    return request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+
+@metricas_bp.before_app_request
+def iniciar_medicao():
+    g.inicio_requisicao = time.perf_counter()
+    g.token_tempos = iniciar_requisicao()
+    requisicoes_em_andamento.somar(1, rota=_rota())
+
+@metricas_bp.after_app_request
+def registrar_medicao(resposta):
+    # Respostas em streaming (exportações) seguem enviando após o teardown: a requisição só sai
+    # do medidor de andamento quando o servidor fecha a resposta
+    rota = _rota()
+    resposta.call_on_close(lambda: requisicoes_em_andamento.somar(-1, rota=rota))
+    g.andamento_no_fechamento = True
+    duracao_requisicao.observar(time.perf_counter() - g.inicio_requisicao, rota=_rota(), metodo=request.method, status=resposta.status_code)
+    if METRICAS_SERVER_TIMING:
+        tempos = tempos_requisicao()
+        cabecalho = tempos.server_timing() if tempos is not None else ''
+        total = f"total;dur={(time.perf_counter() - g.inicio_requisicao) * 1000:.1f}"
+        resposta.headers['Server-Timing'] = f"{cabecalho}, {total}" if cabecalho else total
+    return resposta
+
+@metricas_bp.teardown_app_request
+def encerrar_medicao(erro=None):
+    if 'token_tempos' in g:
+        if not g.pop('andamento_no_fechamento', False):
+            requisicoes_em_andamento.somar(-1, rota=_rota())
+        encerrar_requisicao(g.pop('token_tempos'))
+
+
+def metricas_caches():
+    caches = {
+        'series': cache_series.estatisticas(),
+        'sugestoes': cache_sugestoes.estatisticas(),
+        'sugestoes_mongo': leituras_sugestoes.estatisticas(),
+        'riscos_corredor': cache_riscos_corredor.estatisticas(),
+        'graficos': cache_graficos.estatisticas(),
+    }
+    acertos, falhas, taxas = [], [], []
+    for nome, estatisticas in caches.items():
+        if 'acertos_memoria' in estatisticas:
+            acertos.append(({"cache": nome, "nivel": "memoria"}, estatisticas['acertos_memoria']))
+            acertos.append(({"cache": nome, "nivel": "disco"}, estatisticas['acertos_disco']))
+        else:
+            acertos.append(({"cache": nome, "nivel": "mongo" if nome == 'sugestoes_mongo' else "memoria"}, estatisticas['acertos']))
+        falhas.append(({"cache": nome}, estatisticas['falhas']))
+        taxas.append(({"cache": nome}, estatisticas['taxa_acerto']))
+    return (
+        formatar('clima_api_cache_acertos_total', 'counter', 'Acertos de cache por nível.', acertos)
+        + formatar('clima_api_cache_falhas_total', 'counter', 'Falhas de cache.', falhas)
+        + formatar('clima_api_cache_taxa_acerto', 'gauge', 'Taxa de acerto acumulada do cache.', taxas)
+        + formatar('clima_api_mongo_leituras_erros_total', 'counter', 'Leituras do cache de sugestões no MongoDB que falharam (contadas como falhas de cache).', [({}, leituras_sugestoes.estatisticas()['erros'])])
+    )
+
+def metricas_modelos():
+    registros = {'floresta': registro_modelos, 'prophet': registro_prophet, 'avaliacao': registro_avaliacoes}
+    treinos, acertos, carregamentos = [], [], []
+    for nome, registro in registros.items():
+        estatisticas = registro.estatisticas()
+        treinos.append(({"modelo": nome}, estatisticas['treinos']))
+        acertos.append(({"modelo": nome}, estatisticas['acertos_memoria']))
+        carregamentos.append(({"modelo": nome}, estatisticas['carregamentos_disco']))
+    return (
+        formatar('clima_api_modelos_ajustados_total', 'counter', 'Modelos ajustados (treinos efetivos).', treinos)
+        + formatar('clima_api_modelos_acertos_memoria_total', 'counter', 'Modelos reutilizados da memória.', acertos)
+        + formatar('clima_api_modelos_carregados_disco_total', 'counter', 'Modelos carregados do disco.', carregamentos)
+    )
+
+def metricas_upstreams():
+    requisicoes, erros, retentativas = [], [], []
+    for upstream, estatisticas in cliente_http.estatisticas().items():
+        requisicoes.append(({"upstream": upstream}, estatisticas['requisicoes']))
+        erros.append(({"upstream": upstream}, estatisticas['erros']))
+        retentativas.append(({"upstream": upstream}, estatisticas['retentativas']))
+    agrupadas = [({"origem": "http"}, cliente_http.agrupadas), ({"origem": "sugerir_rota"}, chamada_sugestao.agrupadas)]
+    return (
+        formatar('clima_api_upstream_requisicoes_total', 'counter', 'Tentativas de chamada a upstreams.', requisicoes)
+        + formatar('clima_api_upstream_erros_total', 'counter', 'Tentativas com erro (falha de rede ou status >= 400).', erros)
+        + formatar('clima_api_upstream_retentativas_total', 'counter', 'Novas tentativas após falha.', retentativas)
+        + formatar('clima_api_chamadas_agrupadas_total', 'counter', 'Chamadas idênticas concorrentes atendidas por outra em andamento.', agrupadas)
+    )
+
+def metricas_filas():
+    return (
+        formatar('clima_api_tarefas_em_andamento', 'gauge', 'Tarefas assíncronas pendentes ou em execução neste processo.', [({}, gerenciador_tarefas.pendentes())])
+        + formatar('clima_api_mongo_gravacoes_pendentes', 'gauge', 'Sugestões aguardando gravação em lote no MongoDB.', [({}, escritor_sugestoes.pendentes())])
+    )
+
+
+@metricas_bp.route('/metrics', methods=['GET'])
+def metricas():
+    linhas = metricas_caches() + metricas_modelos() + metricas_upstreams() + metricas_filas()
+    return Response(exportar(linhas), mimetype='text/plain; version=0.0.4')
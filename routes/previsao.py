@@ -1,8 +1,12 @@
-from flask import Blueprint, request, jsonify
-from services.meteostat_service import carregar_dados
-from services.model_service import treinar_modelo, prever_variavel
-import pandas as pd
+from flask import Blueprint, request, jsonify, Response
+from services.previsao_service import prever_local, prever_lote
+from services.model_service import validar_modelo
+from services.grade_service import celula
+from services.previsao_store import armazem_previsoes
+from services.metricas_service import medir
+from config import LOTE_MAX_ITENS, MODELO_PREVISAO
 from datetime import datetime
+import json
 
 previsao_bp = Blueprint('previsao', __name__)
 
@@ -14,20 +18,50 @@ def previsao():
 
     if not lat or not lon or not data_futura:
         return jsonify({"erro": "Os parâmetros 'lat', 'lon' e 'data' são obrigatórios."}), 400
+    try:
+        modelo = validar_modelo(request.args.get('modelo'))
+        celula_local = celula(lat, lon)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
 
     try:
         datetime.strptime(data_futura, '%Y-%m-%d')
-        df = carregar_dados(lat, lon)
-        model = treinar_modelo(df)
-        previsoes = {coluna: prever_variavel(df, coluna, data_futura) for coluna in ['tavg', 'tmin', 'tmax', 'prcp', 'wspd', 'pres']}
-        dados_futuros = pd.DataFrame(previsoes, index=[0])
-        previsao_risco = model.predict(dados_futuros)[0]
+        # Previsões pré-calculadas pelo agendador (worker.py, modelo padrão) são servidas enquanto estiverem válidas
+        resultado = None
+        if modelo == MODELO_PREVISAO:
+            with medir('armazem_previsoes'):
+                resultado = armazem_previsoes.buscar(lat, lon, data_futura)
+        resultado = resultado or prever_local(lat, lon, [data_futura], modelo=modelo)[0]
 
         return jsonify({
             "localizacao": {"latitude": lat, "longitude": lon},
+            "celula": celula_local,
             "data": data_futura,
-            "previsao": previsoes,
-            "risco": "Alto" if previsao_risco == 1 else "Baixo"
+            "modelo": modelo,
+            "previsao": resultado["previsao"],
+            "intervalo": resultado.get("intervalo"),
+            "risco": resultado["risco"]
         })
     except Exception as e:
         return jsonify({"erro": str(e)}), 500
+
+
+@previsao_bp.route('/previsao/lote', methods=['POST'])
+def previsao_lote():
+    corpo = request.get_json(silent=True)
+    itens = corpo.get('itens') if isinstance(corpo, dict) else corpo
+
+    if not isinstance(itens, list) or not itens:
+        return jsonify({"erro": "Envie uma lista de itens com 'lat', 'lon' e 'data'."}), 400
+    if len(itens) > LOTE_MAX_ITENS:
+        return jsonify({"erro": f"O lote aceita no máximo {LOTE_MAX_ITENS} itens."}), 400
+    try:
+        modelo = validar_modelo(request.args.get('modelo') or (corpo.get('modelo') if isinstance(corpo, dict) else None))
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+
+    def gerar():
+        for resultado in prever_lote(itens, modelo):
+            yield json.dumps(resultado, ensure_ascii=False) + "\n"
+
+    return Response(gerar(), mimetype='application/x-ndjson')
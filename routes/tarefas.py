@@ -0,0 +1,44 @@
+from flask import Blueprint, request, jsonify, url_for
+from services.tarefas_service import gerenciador_tarefas, FilaCheia
+
+tarefas_bp = Blueprint('tarefas', __name__)
+
+@tarefas_bp.route('/jobs', methods=['POST'])
+def submeter_tarefa():
+    corpo = request.get_json(silent=True)
+
+    if not isinstance(corpo, dict) or not corpo.get('tipo'):
+        return jsonify({"erro": f"Informe o 'tipo' da tarefa: {', '.join(gerenciador_tarefas.tipos())}."}), 400
+
+    try:
+        tarefa = gerenciador_tarefas.submeter(corpo['tipo'], corpo)
+    except FilaCheia as e:
+        return jsonify({"erro": str(e)}), 503
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+
+    # 202: a tarefa foi aceita; o cliente acompanha o progresso em GET /jobs/<id>
+    resposta = jsonify(tarefa)
+    resposta.status_code = 202
+    resposta.headers['Location'] = url_for('tarefas.consultar_tarefa', tarefa_id=tarefa['id'])
+    return resposta
+
+
+@tarefas_bp.route('/jobs/<tarefa_id>', methods=['GET'])
+def consultar_tarefa(tarefa_id):
+    tarefa = gerenciador_tarefas.obter(tarefa_id)
+
+    if tarefa is None:
+        return jsonify({"erro": "Tarefa não encontrada ou expirada."}), 404
+
+    return jsonify(tarefa)
+
+
+@tarefas_bp.route('/jobs/<tarefa_id>', methods=['DELETE'])
+def cancelar_tarefa(tarefa_id):
+    tarefa = gerenciador_tarefas.cancelar(tarefa_id)
+
+    if tarefa is None:
+        return jsonify({"erro": "Tarefa não encontrada ou expirada."}), 404
+
+    return jsonify(tarefa)
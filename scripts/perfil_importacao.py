@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que não devem ser importados na inicialização (carregados no primeiro uso).
+# O pyarrow fica de fora: o pandas o importa sempre que está instalado.
+MODULOS_PESADOS = ['prophet', 'cmdstanpy', 'sklearn', 'matplotlib', 'seaborn', 'folium', 'openpyxl', 'pymongo']
+# Dependências importadas de qualquer forma; o que elas já trazem não conta como regressão da aplicação
+MODULOS_BASE = ['pandas']
+
+def medir(alvo):
+    # Executa "python -X importtime" num processo limpo e lê o relatório do stderr
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {alvo}'],
+        cwd=RAIZ, capture_output=True, text=True
+    )
+    if processo.returncode != 0:
+        raise SystemExit(f"Falha ao importar '{alvo}':\n{processo.stderr}")
+
+    modulos = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:') or '[us]' in linha:
+            continue
+        proprio, acumulado, nome = (parte.strip() for parte in linha[len('import time:'):].split('|'))
+        modulos[nome.strip()] = {"proprio_us": int(proprio), "acumulado_us": int(acumulado)}
+    return modulos
+
+def relatorio(alvo, modulos, top, modulos_base=()):
+    raizes = {nome.split('.')[0] for nome in modulos if nome not in modulos_base}
+    return {
+        "alvo": alvo,
+        "total_ms": round(modulos.get(alvo, {"acumulado_us": 0})["acumulado_us"] / 1000, 1),
+        "modulos_importados": len(modulos),
+        "pesados_importados": sorted(raizes.intersection(MODULOS_PESADOS)),
+        "mais_lentos": [
+            {"modulo": nome, "proprio_ms": round(tempos["proprio_us"] / 1000, 1), "acumulado_ms": round(tempos["acumulado_us"] / 1000, 1)}
+            for nome, tempos in sorted(modulos.items(), key=lambda item: item[1]["proprio_us"], reverse=True)[:top]
+        ],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de tempo de importação da aplicação (python -X importtime).")
+    parser.add_argument('--alvo', default='app', help="Módulo importado (padrão: app).")
+    parser.add_argument('--top', type=int, default=15, help="Quantidade de módulos mais lentos listados.")
+    parser.add_argument('--saida', help="Grava o relatório em JSON neste arquivo.")
+    parser.add_argument('--base', help="Relatório JSON anterior para comparação.")
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="Regressão máxima aceita em relação à base (fração).")
+    parser.add_argument('--limite-ms', type=float, help="Falha se o tempo total passar deste limite.")
+    args = parser.parse_args()
+
+    modulos_base = set()
+    for base in MODULOS_BASE:
+        modulos_base.update(medir(base))
+    dados = relatorio(args.alvo, medir(args.alvo), args.top, modulos_base)
+    print(json.dumps(dados, indent=2, ensure_ascii=False))
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(dados, f, indent=2, ensure_ascii=False)
+
+    falhas = []
+    if dados["pesados_importados"]:
+        falhas.append(f"módulos pesados importados na inicialização: {', '.join(dados['pesados_importados'])}")
+    if args.limite_ms is not None and dados["total_ms"] > args.limite_ms:
+        falhas.append(f"tempo total {dados['total_ms']}ms acima do limite de {args.limite_ms}ms")
+    if args.base:
+        with open(args.base) as f:
+            base = json.load(f)
+        if dados["total_ms"] > base["total_ms"] * (1 + args.tolerancia):
+            falhas.append(f"tempo total {dados['total_ms']}ms é mais de {args.tolerancia:.0%} acima da base ({base['total_ms']}ms)")
+
+    if falhas:
+        raise SystemExit("Regressão de inicialização: " + "; ".join(falhas))
+
+if __name__ == '__main__':
+    main()
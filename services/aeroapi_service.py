@@ -1,17 +1,26 @@
-import requests
+from services.http_client import cliente_http
+from services.aeroporto_index import indice_aeroportos
+from services.metricas_service import medir
 from config import AERO_API_URL, AEROAPI_HEADERS
 
 def obter_coordenadas_aeroporto(aeroporto_id):
+    coordenadas = indice_aeroportos.coordenadas(aeroporto_id)
+    if coordenadas is not None:
+        return coordenadas
+
     url = f"{AERO_API_URL}/airports/{aeroporto_id}"
-    response = requests.get(url, headers=AEROAPI_HEADERS)
+    with medir('aeroapi_coordenadas'):
+        response = cliente_http.get(url, headers=AEROAPI_HEADERS, upstream='aeroapi')
     if response.status_code == 200:
         data = response.json()
+        indice_aeroportos.adicionar(data.get('code_icao') or aeroporto_id, data.get('code_iata'), data.get('name'), data['latitude'], data['longitude'])
         return data['latitude'], data['longitude']
     raise ValueError(f"Erro ao obter coordenadas do aeroporto {aeroporto_id}: {response.status_code}")
 
 def obter_rotas_aeroporto(origem_id, destino_id):
     url = f"{AERO_API_URL}/airports/{origem_id}/routes/{destino_id}"
-    response = requests.get(url, headers=AEROAPI_HEADERS)
+    with medir('aeroapi_rotas'):
+        response = cliente_http.get(url, headers=AEROAPI_HEADERS, upstream='aeroapi')
     if response.status_code == 200:
         return response.json()
     raise ValueError(f"Erro ao obter rotas entre {origem_id} e {destino_id}: {response.status_code}")
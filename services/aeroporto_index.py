@@ -0,0 +1,142 @@
+import csv
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import AEROPORTOS_ARQUIVO
+
+COLUNAS_INDICE = ['icao', 'iata', 'nome', 'latitude', 'longitude']
+RAIO_TERRA_KM = 6371.0088
+
+# Colunas do formato público do OurAirports (airports.csv)
+COLUNAS_OURAIRPORTS = {'ident': 'icao', 'iata_code': 'iata', 'name': 'nome', 'latitude_deg': 'latitude', 'longitude_deg': 'longitude'}
+
+
+class IndiceAeroportos:
+    # Tabela local de aeroportos (ICAO/IATA -> coordenadas) com busca espacial por vizinhos mais próximos
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self._lock = threading.Lock()
+        self._tabela = None
+        self._codigos = {}
+        self._arvore = None
+
+    def coordenadas(self, codigo):
+        with self._lock:
+            self._carregar()
+            posicao = self._codigos.get(codigo.upper())
+            if posicao is None:
+                return None
+            linha = self._tabela.iloc[posicao]
+            return float(linha['latitude']), float(linha['longitude'])
+
+    def adicionar(self, icao, iata, nome, latitude, longitude):
+        registro = {'icao': (icao or '').upper(), 'iata': (iata or '').upper(), 'nome': nome or '', 'latitude': float(latitude), 'longitude': float(longitude)}
+        with self._lock:
+            self._carregar()
+            # Busca e inserção sob o mesmo lock: falhas simultâneas ou as formas IATA e ICAO do mesmo
+            # aeroporto não duplicam a linha
+            posicao = self._codigos.get(registro['icao'] or registro['iata'])
+            if posicao is not None:
+                if registro['iata']:
+                    self._codigos.setdefault(registro['iata'], posicao)
+                return
+            posicao = len(self._tabela)
+            self._tabela.loc[posicao] = registro
+            for codigo in (registro['icao'], registro['iata']):
+                if codigo:
+                    self._codigos[codigo] = posicao
+            self._arvore = None
+
+            novo_arquivo = not os.path.exists(self.arquivo)
+            os.makedirs(os.path.dirname(self.arquivo) or '.', exist_ok=True)
+            with open(self.arquivo, 'a', newline='', encoding='utf-8') as f:
+                escritor = csv.DictWriter(f, fieldnames=COLUNAS_INDICE)
+                if novo_arquivo:
+                    escritor.writeheader()
+                escritor.writerow(registro)
+
+    def importar(self, caminho):
+        # Carga em lote a partir do formato do índice ou do airports.csv do OurAirports
+        novos = pd.read_csv(caminho, dtype=str, keep_default_na=False)
+        if 'ident' in novos.columns:
+            novos = novos.rename(columns=COLUNAS_OURAIRPORTS)
+        novos = novos[COLUNAS_INDICE].copy()
+        novos['icao'] = novos['icao'].str.upper()
+        novos['iata'] = novos['iata'].str.upper()
+        novos['latitude'] = pd.to_numeric(novos['latitude'], errors='coerce')
+        novos['longitude'] = pd.to_numeric(novos['longitude'], errors='coerce')
+        novos = novos.dropna(subset=['latitude', 'longitude'])
+
+        with self._lock:
+            self._carregar()
+            tabela = pd.concat([self._tabela, novos], ignore_index=True)
+            tabela = tabela.drop_duplicates(subset=['icao'], keep='last')
+            self._definir_tabela(tabela)
+
+            os.makedirs(os.path.dirname(self.arquivo) or '.', exist_ok=True)
+            temporario = f"{self.arquivo}.tmp{os.getpid()}"
+            self._tabela.to_csv(temporario, index=False, columns=COLUNAS_INDICE)
+            os.replace(temporario, self.arquivo)
+        return len(novos)
+
+    def mais_proximos(self, lat, lon, k=1):
+        with self._lock:
+            self._carregar()
+            if self._tabela.empty:
+                return []
+            if self._arvore is None:
+                from sklearn.neighbors import BallTree
+
+                pontos = np.radians(self._tabela[['latitude', 'longitude']].to_numpy(dtype='float64'))
+                self._arvore = BallTree(pontos, metric='haversine')
+            k = min(k, len(self._tabela))
+            distancias, posicoes = self._arvore.query(np.radians([[lat, lon]]), k=k)
+            resultado = []
+            for distancia, posicao in zip(distancias[0], posicoes[0]):
+                linha = self._tabela.iloc[posicao]
+                resultado.append({
+                    "icao": linha['icao'],
+                    "iata": linha['iata'],
+                    "nome": linha['nome'],
+                    "latitude": float(linha['latitude']),
+                    "longitude": float(linha['longitude']),
+                    "distancia_km": round(float(distancia) * RAIO_TERRA_KM, 2),
+                })
+            return resultado
+
+    def _carregar(self):
+        if self._tabela is not None:
+            return
+        if os.path.exists(self.arquivo):
+            tabela = pd.read_csv(self.arquivo, dtype={'icao': str, 'iata': str, 'nome': str}, keep_default_na=False)
+            # Arquivos gravados antes da deduplicação podem repetir um ICAO
+            tabela = tabela.drop_duplicates(subset=['icao'], keep='last')
+        else:
+            tabela = pd.DataFrame(columns=COLUNAS_INDICE)
+        self._definir_tabela(tabela)
+
+    def _definir_tabela(self, tabela):
+        tabela = tabela.reset_index(drop=True)
+        tabela['latitude'] = tabela['latitude'].astype('float64')
+        tabela['longitude'] = tabela['longitude'].astype('float64')
+        codigos = {}
+        for posicao, (icao, iata) in enumerate(zip(tabela['icao'], tabela['iata'])):
+            for codigo in (icao, iata):
+                if codigo:
+                    codigos[codigo.upper()] = posicao
+        self._tabela = tabela
+        self._codigos = codigos
+        self._arvore = None
+
+
+indice_aeroportos = IndiceAeroportos(AEROPORTOS_ARQUIVO)
+
+
+if __name__ == '__main__':
+    # Uso: python -m services.aeroporto_index airports.csv
+    for caminho in sys.argv[1:]:
+        print(f"{caminho}: {indice_aeroportos.importar(caminho)} aeroportos importados")
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from config import COLUNAS_CLIMA, AVALIACOES_DIR, AVALIACOES_MAX_MEMORIA, AVALIACOES_MAX_BYTES, AVALIACAO_N_JOBS
+from services.model_service import HIPERPARAMETROS_FLORESTA
+from services.registro_modelos import RegistroModelos
+
+PARAMETROS_AVALIACAO = {"floresta": HIPERPARAMETROS_FLORESTA, "test_size": 0.2, "random_state": 42, "cv": 5}
+
+registro_avaliacoes = RegistroModelos(AVALIACOES_DIR, AVALIACOES_MAX_MEMORIA, AVALIACOES_MAX_BYTES)
+
+def calcular_avaliacao(df, colunas, parametros):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split, cross_val_score
+    from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+
+    X = df[COLUNAS_CLIMA]
+    y = df['risk']
+    x_train, x_test, y_train, y_test = train_test_split(X, y, test_size=parametros['test_size'], random_state=parametros['random_state'])
+
+    model = RandomForestClassifier(**parametros['floresta'])
+    model.fit(x_train, y_train)
+
+    y_pred = model.predict(x_test)
+    cv_scores = cross_val_score(RandomForestClassifier(**parametros['floresta']), X, y, cv=parametros['cv'], scoring='accuracy', n_jobs=AVALIACAO_N_JOBS)
+
+    return {
+        "acuracia": float(accuracy_score(y_test, y_pred)),
+        "relatorio_classificacao": classification_report(y_test, y_pred, output_dict=True),
+        "matriz_confusao": confusion_matrix(y_test, y_pred),
+        "validacao_cruzada": cv_scores,
+        "importancia_variaveis": pd.Series(model.feature_importances_, index=X.columns),
+    }
+
+def avaliar_modelo(df):
+    # Divisão, ajuste, métricas e validação cruzada calculados uma vez por impressão digital dos dados
+    return registro_avaliacoes.obter(df, COLUNAS_CLIMA + ['risk'], PARAMETROS_AVALIACAO, calcular_avaliacao)
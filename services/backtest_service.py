@@ -0,0 +1,159 @@
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import COLUNAS_CLIMA, BACKTEST_HORIZONTE_MESES, BACKTEST_ORIGENS
+from services.cache_service import cache_series
+from services.model_service import HIPERPARAMETROS_PROPHET, ajustar_prophet, limitar_nao_negativas, prever_harmonico
+
+logger = logging.getLogger('backtest')
+
+# Backtest com origem móvel sobre as séries em cache: cada origem treina com o histórico até o corte
+# e prevê os meses seguintes. Os modelos são ajustados aqui diretamente, sem passar pelos registros.
+
+def prever_prophet_direto(df, colunas, datas):
+    futuro = pd.DataFrame({'ds': pd.to_datetime(datas)})
+    previsoes = {}
+    for coluna in colunas:
+        previsao = ajustar_prophet(df, [coluna], HIPERPARAMETROS_PROPHET).predict(futuro)
+        previsoes[coluna] = {"yhat": previsao['yhat'].to_numpy(), "inferior": previsao['yhat_lower'].to_numpy(), "superior": previsao['yhat_upper'].to_numpy()}
+    return previsoes
+
+MOTORES_BACKTEST = {
+    'prophet': prever_prophet_direto,
+    'harmonico': prever_harmonico,
+}
+
+def series_em_cache():
+    series = {}
+    for chave in cache_series.chaves():
+        df = cache_series.obter_expirado(chave)
+        if df is not None and len(df):
+            series[chave] = df
+    return series
+
+def series_locais(locais):
+    from services.meteostat_service import carregar_dados
+
+    series = {}
+    for par in locais.split(';'):
+        if par.strip():
+            lat, lon = (float(valor) for valor in par.split(','))
+            series[par.strip()] = carregar_dados(lat, lon)[COLUNAS_CLIMA]
+    return series
+
+def cortes(n, horizonte, origens, minimo):
+    # Origens mais recentes primeiro, recuando um horizonte por vez, sem deixar o treino menor que o mínimo
+    return [n - horizonte * i for i in range(1, origens + 1) if n - horizonte * i >= minimo]
+
+def backtest_serie(df, modelos, horizonte, origens, minimo=24):
+    df = df[COLUNAS_CLIMA].astype('float64').sort_index()
+    erros = {modelo: {coluna: [] for coluna in COLUNAS_CLIMA} for modelo in modelos}
+    cobertos = {modelo: {coluna: [] for coluna in COLUNAS_CLIMA} for modelo in modelos}
+    tempos = {modelo: 0.0 for modelo in modelos}
+    escalas = {}
+    for corte in cortes(len(df), horizonte, origens, minimo):
+        treino, teste = df.iloc[:corte], df.iloc[corte:corte + horizonte]
+        for modelo in modelos:
+            inicio = time.perf_counter()
+            # Mesmo corte em 0 aplicado às previsões servidas pela API
+            previsoes = limitar_nao_negativas(MOTORES_BACKTEST[modelo](treino, COLUNAS_CLIMA, list(teste.index)))
+            tempos[modelo] += time.perf_counter() - inicio
+            for coluna in COLUNAS_CLIMA:
+                real = teste[coluna].to_numpy()
+                previsao = previsoes[coluna]
+                erros[modelo][coluna].extend(np.asarray(previsao["yhat"]) - real)
+                cobertos[modelo][coluna].extend((real >= previsao["inferior"]) & (real <= previsao["superior"]))
+        for coluna in COLUNAS_CLIMA:
+            escalas.setdefault(coluna, []).append(float(treino[coluna].std()) or 1.0)
+    return erros, cobertos, tempos, {coluna: float(np.mean(valores)) for coluna, valores in escalas.items()}
+
+def resumir(erros, cobertos, escalas):
+    resumo = {}
+    for coluna in COLUNAS_CLIMA:
+        residuos = np.asarray(erros[coluna], dtype='float64')
+        if not len(residuos):
+            continue
+        mae = float(np.abs(residuos).mean())
+        resumo[coluna] = {
+            "mae": round(mae, 3),
+            "rmse": round(float(np.sqrt((residuos ** 2).mean())), 3),
+            # MAE normalizado pelo desvio padrão do treino: comparável entre variáveis
+            "nmae": round(mae / escalas[coluna], 3),
+            "cobertura": round(float(np.mean(cobertos[coluna])), 3),
+            "n": int(len(residuos)),
+        }
+    return resumo
+
+def executar_backtest(series, modelos, horizonte=None, origens=None):
+    horizonte = horizonte or BACKTEST_HORIZONTE_MESES
+    origens = origens or BACKTEST_ORIGENS
+    erros = {modelo: {coluna: [] for coluna in COLUNAS_CLIMA} for modelo in modelos}
+    cobertos = {modelo: {coluna: [] for coluna in COLUNAS_CLIMA} for modelo in modelos}
+    tempos = {modelo: 0.0 for modelo in modelos}
+    escalas = {}
+    for nome, df in series.items():
+        logger.info("backtest: %s (%d meses)", nome, len(df))
+        erros_serie, cobertos_serie, tempos_serie, escalas_serie = backtest_serie(df, modelos, horizonte, origens)
+        for modelo in modelos:
+            tempos[modelo] += tempos_serie[modelo]
+            for coluna in COLUNAS_CLIMA:
+                erros[modelo][coluna] += erros_serie[modelo][coluna]
+                cobertos[modelo][coluna] += cobertos_serie[modelo][coluna]
+        for coluna, escala in escalas_serie.items():
+            escalas.setdefault(coluna, []).append(escala)
+    escalas = {coluna: float(np.mean(valores)) for coluna, valores in escalas.items()}
+
+    resultados = {}
+    for modelo in modelos:
+        por_coluna = resumir(erros[modelo], cobertos[modelo], escalas)
+        resultados[modelo] = {
+            "colunas": por_coluna,
+            "nmae_medio": round(float(np.mean([metricas["nmae"] for metricas in por_coluna.values()])), 3) if por_coluna else None,
+            "cobertura_media": round(float(np.mean([metricas["cobertura"] for metricas in por_coluna.values()])), 3) if por_coluna else None,
+            "tempo_ajuste_s": round(tempos[modelo], 3),
+        }
+    return {"series": len(series), "horizonte_meses": horizonte, "origens": origens, "modelos": resultados, "recomendacao": recomendar(resultados)}
+
+def recomendar(resultados):
+    validos = {modelo: dados for modelo, dados in resultados.items() if dados["nmae_medio"] is not None}
+    if not validos:
+        return None
+    melhor = min(validos, key=lambda modelo: validos[modelo]["nmae_medio"])
+    mais_rapido = min(validos, key=lambda modelo: validos[modelo]["tempo_ajuste_s"])
+    return {"menor_erro": melhor, "mais_rapido": mais_rapido}
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest dos modelos de previsão (Prophet e harmônico) sobre as séries em cache.")
+    parser.add_argument('--modelos', default=','.join(MOTORES_BACKTEST), help="Modelos separados por vírgula.")
+    parser.add_argument('--locais', help="Locais 'lat,lon;lat,lon' (baixados se preciso); sem ele usa todas as séries em cache.")
+    parser.add_argument('--horizonte', type=int, default=BACKTEST_HORIZONTE_MESES, help="Meses previstos a partir de cada origem.")
+    parser.add_argument('--origens', type=int, default=BACKTEST_ORIGENS, help="Número de origens móveis por série.")
+    parser.add_argument('--saida', help="Grava os resultados em JSON neste arquivo.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    for nome in ('cmdstanpy', 'prophet'):
+        logging.getLogger(nome).setLevel(logging.WARNING)
+
+    modelos = [modelo.strip() for modelo in args.modelos.split(',') if modelo.strip()]
+    for modelo in modelos:
+        if modelo not in MOTORES_BACKTEST:
+            raise SystemExit(f"Modelo inválido. Use um de: {', '.join(MOTORES_BACKTEST)}.")
+    series = series_locais(args.locais) if args.locais else series_em_cache()
+    if not series:
+        raise SystemExit("Nenhuma série disponível: informe --locais ou aqueça o cache antes.")
+
+    resultados = executar_backtest(series, modelos, args.horizonte, args.origens)
+    texto = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            f.write(texto)
+    print(texto)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from config import CACHE_DIR, CACHE_TTL_SEGUNDOS, CACHE_MAX_BYTES, CACHE_MAX_MEMORIA, CACHE_DTYPE, COLUNAS_CLIMA
+
+
+class CacheSeries:
+    # Cache em dois níveis: memória (LRU) sobre disco (arrays NumPy mapeados em memória)
+    def __init__(self, diretorio, ttl, max_bytes, max_memoria, dtype='float64'):
+        self.diretorio = diretorio
+        self.dtype = dtype
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_memoria = max_memoria
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+
+    def chave(self, celula_id, inicio):
+        return f"{celula_id}_{inicio}"
+
+    def obter(self, chave):
+        agora = time.time()
+        with self._lock:
+            item = self._memoria.get(chave)
+            if item is not None and agora - item[0] < self.ttl:
+                self._memoria.move_to_end(chave)
+                self.acertos_memoria += 1
+                return item[1].copy(deep=False)
+
+        df, criado_em = self._ler_disco(chave, agora)
+
+        with self._lock:
+            if df is None:
+                self._memoria.pop(chave, None)
+                self.falhas += 1
+                return None
+            self.acertos_disco += 1
+            self._guardar_memoria(chave, criado_em, df)
+        return df.copy(deep=False)
+
+    def obter_expirado(self, chave):
+        # Série armazenada mesmo após a validade (base da atualização incremental); não conta nas estatísticas
+        with self._lock:
+            item = self._memoria.get(chave)
+            if item is not None:
+                return item[1].copy(deep=False)
+        df, _ = self._ler_disco(chave, time.time(), incluir_expirados=True)
+        return df
+
+    def salvar(self, chave, df):
+        os.makedirs(self.diretorio, exist_ok=True)
+        pasta = self._pasta(chave)
+        temporaria = f"{pasta}.tmp{os.getpid()}_{threading.get_ident()}"
+        criado_em = time.time()
+
+        os.makedirs(temporaria, exist_ok=True)
+        np.save(os.path.join(temporaria, 'valores.npy'), np.ascontiguousarray(df.to_numpy(dtype=self.dtype)))
+        np.save(os.path.join(temporaria, 'indice.npy'), df.index.values.astype('datetime64[ns]'))
+        with open(os.path.join(temporaria, 'meta.json'), 'w') as f:
+            json.dump({"colunas": list(df.columns), "criado_em": criado_em}, f)
+
+        shutil.rmtree(pasta, ignore_errors=True)
+        os.replace(temporaria, pasta)
+
+        with self._lock:
+            self._guardar_memoria(chave, criado_em, df)
+        self._evictar_disco()
+
+    def chaves(self):
+        # Séries presentes no disco, vencidas ou não (usado pelo backtest dos modelos)
+        try:
+            nomes = os.listdir(self.diretorio)
+        except OSError:
+            return []
+        return sorted(nome for nome in nomes if '.tmp' not in nome and os.path.isdir(self._pasta(nome)))
+
+    def limpar(self):
+        with self._lock:
+            self._memoria.clear()
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def estatisticas(self):
+        with self._lock:
+            acertos = self.acertos_memoria + self.acertos_disco
+            total = acertos + self.falhas
+            return {
+                "acertos_memoria": self.acertos_memoria,
+                "acertos_disco": self.acertos_disco,
+                "falhas": self.falhas,
+                "taxa_acerto": acertos / total if total else 0.0,
+                "itens_memoria": len(self._memoria),
+            }
+
+    def _pasta(self, chave):
+        return os.path.join(self.diretorio, chave)
+
+    def _guardar_memoria(self, chave, criado_em, df):
+        self._memoria[chave] = (criado_em, df)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _ler_disco(self, chave, agora, incluir_expirados=False):
+        pasta = self._pasta(chave)
+        try:
+            with open(os.path.join(pasta, 'meta.json')) as f:
+                meta = json.load(f)
+            # Séries expiradas ficam no disco até a atualização incremental ou o descarte por tamanho
+            if agora - meta['criado_em'] >= self.ttl and not incluir_expirados:
+                return None, None
+            valores = np.load(os.path.join(pasta, 'valores.npy'), mmap_mode='r')
+            indice = np.load(os.path.join(pasta, 'indice.npy'))
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+        # Atualiza o mtime da pasta para a política LRU do disco
+        os.utime(pasta)
+        df = pd.DataFrame(valores, index=pd.DatetimeIndex(indice, name='date'), columns=meta['colunas'], copy=False)
+        return df, meta['criado_em']
+
+    def _evictar_disco(self):
+        entradas = []
+        total = 0
+        try:
+            nomes = os.listdir(self.diretorio)
+        except OSError:
+            return
+        for nome in nomes:
+            pasta = os.path.join(self.diretorio, nome)
+            if '.tmp' in nome or not os.path.isdir(pasta):
+                continue
+            try:
+                tamanho = sum(os.path.getsize(os.path.join(pasta, arquivo)) for arquivo in os.listdir(pasta))
+                entradas.append((os.path.getmtime(pasta), tamanho, pasta))
+            except OSError:
+                continue
+            total += tamanho
+
+        for _, tamanho, pasta in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(pasta, ignore_errors=True)
+            total -= tamanho
+
+
+class CacheMemoria:
+    # LRU em memória com validade opcional por item
+    def __init__(self, max_itens, ttl=None):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or (self.ttl is not None and time.time() - item[0] >= self.ttl):
+                self._itens.pop(chave, None)
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def salvar(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = (time.time(), valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {"acertos": self.acertos, "falhas": self.falhas, "taxa_acerto": self.acertos / total if total else 0.0, "itens": len(self._itens)}
+
+
+class ChamadaUnica:
+    # Agrupa chamadas concorrentes idênticas: só a primeira executa, as demais recebem o mesmo resultado
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chamadas = {}
+        self.agrupadas = 0
+
+    def executar(self, chave, funcao, *args, **kwargs):
+        with self._lock:
+            chamada = self._chamadas.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._chamadas[chave] = {"evento": threading.Event(), "resultado": None, "erro": None}
+            else:
+                self.agrupadas += 1
+
+        if not lider:
+            chamada["evento"].wait()
+            if chamada["erro"] is not None:
+                raise chamada["erro"]
+            return chamada["resultado"]
+
+        try:
+            chamada["resultado"] = funcao(*args, **kwargs)
+            return chamada["resultado"]
+        except Exception as e:
+            chamada["erro"] = e
+            raise
+        finally:
+            with self._lock:
+                self._chamadas.pop(chave, None)
+            chamada["evento"].set()
+
+
+# Casas decimais dos dados do Meteostat e das colunas derivadas (médias móveis, codificação do mês)
+CASAS_DECIMAIS_FONTE = 1
+CASAS_DECIMAIS_DERIVADAS = 4
+
+def restaurar_precisao(df):
+    # O float32 é só armazenamento: na saída para o cliente volta a float64 arredondado,
+    # sem artefatos como 23.6000003815
+    flutuantes = df.select_dtypes('floating').columns
+    if not len(flutuantes):
+        return df
+    casas = {coluna: CASAS_DECIMAIS_FONTE if coluna in COLUNAS_CLIMA else CASAS_DECIMAIS_DERIVADAS for coluna in flutuantes}
+    return df.astype({coluna: 'float64' for coluna in flutuantes}).round(casas)
+
+def impressao_digital(df, colunas=None, **extras):
+    # Identifica um conjunto de dados pelo conteúdo, janela de datas, célula e parâmetros extras
+    dados = df if colunas is None else df[list(colunas)]
+    metadados = {
+        "colunas": list(dados.columns),
+        "celula": df.attrs.get('celula'),
+        "inicio": str(dados.index.min()) if len(dados) else None,
+        "fim": str(dados.index.max()) if len(dados) else None,
+        **extras,
+    }
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(dados, index=True).values.tobytes())
+    h.update(json.dumps(metadados, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+cache_series = CacheSeries(os.path.join(CACHE_DIR, 'series'), CACHE_TTL_SEGUNDOS, CACHE_MAX_BYTES, CACHE_MAX_MEMORIA, CACHE_DTYPE)
@@ -0,0 +1,43 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import EXECUTOR_CPU_THREADS, EXECUTOR_IO_THREADS, TAREFAS_WORKERS, METEOSTAT_CONCORRENCIA
+
+# Pools separados: ajustes e previsões (CPU) não disputam threads com chamadas a upstreams (I/O).
+# Tarefas do pool de I/O podem aguardar tarefas do pool de CPU, nunca o contrário; as tarefas
+# assíncronas (/jobs) têm pool próprio e podem aguardar os dois. O pool de ingestão só executa
+# chamadas ao Meteostat (não aguarda nenhum outro) e limita a concorrência contra a API.
+_executores = {}
+_lock = threading.Lock()
+
+
+class ExecutorContexto(ThreadPoolExecutor):
+    # Executa cada tarefa no contexto (contextvars) de quem a submeteu, para que as medições cheguem à requisição
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _obter(nome, threads):
+    with _lock:
+        executor = _executores.get(nome)
+        if executor is None:
+            executor = _executores[nome] = ExecutorContexto(max_workers=threads, thread_name_prefix=nome)
+        return executor
+
+def executor_cpu():
+    return _obter('cpu', EXECUTOR_CPU_THREADS)
+
+def executor_io():
+    return _obter('io', EXECUTOR_IO_THREADS)
+
+def executor_ingestao():
+    return _obter('ingestao', METEOSTAT_CONCORRENCIA)
+
+def executor_tarefas():
+    return _obter('tarefas', TAREFAS_WORKERS)
+
+def reiniciar_executores():
+    # Após um fork as threads dos pools herdados não existem no processo filho
+    with _lock:
+        _executores.clear()
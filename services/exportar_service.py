@@ -0,0 +1,212 @@
+import queue
+import threading
+import zipfile
+
+from config import EXPORTAR_LINHAS_POR_BLOCO, EXPORTAR_BYTES_POR_BLOCO, EXPORTAR_MAX_BLOCOS_FILA
+from services.cache_service import restaurar_precisao
+from services.meteostat_service import carregar_dados
+
+FORMATOS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+_FIM = object()
+
+
+class FluxoFila:
+    # Arquivo somente-escrita, não posicionável, cujos blocos são consumidos por um gerador (fila limitada)
+    def __init__(self, bytes_por_bloco, max_blocos):
+        self.bytes_por_bloco = bytes_por_bloco
+        self._fila = queue.Queue(maxsize=max_blocos)
+        self._buffer = bytearray()
+        self._posicao = 0
+        self.cancelado = False
+
+    def write(self, dados):
+        self._buffer += dados
+        self._posicao += len(dados)
+        if len(self._buffer) >= self.bytes_por_bloco:
+            self._enfileirar(bytes(self._buffer))
+            self._buffer.clear()
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def seek(self, *args):
+        raise OSError("Fluxo de exportação não é posicionável.")
+
+    def seekable(self):
+        return False
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    @property
+    def closed(self):
+        return False
+
+    def finalizar(self):
+        if self._buffer:
+            self._enfileirar(bytes(self._buffer))
+            self._buffer.clear()
+        self._enfileirar(_FIM)
+
+    def blocos(self):
+        try:
+            while True:
+                bloco = self._fila.get()
+                if bloco is _FIM:
+                    return
+                if isinstance(bloco, Exception):
+                    raise bloco
+                yield bloco
+        finally:
+            self.cancelado = True
+
+    def falhar(self, erro):
+        self._enfileirar(erro)
+
+    def _enfileirar(self, item):
+        # Backpressure: o produtor espera o cliente consumir; desiste se o download foi interrompido
+        while True:
+            if self.cancelado:
+                raise OSError("Download interrompido pelo cliente.")
+            try:
+                self._fila.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+
+class _EntradaZip:
+    # Adapta uma entrada de ZipFile para escritores que consultam tell()
+    def __init__(self, destino):
+        self._destino = destino
+        self._posicao = 0
+
+    def write(self, dados):
+        self._destino.write(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def seek(self, *args):
+        raise OSError("Entrada zip não é posicionável.")
+
+    def seekable(self):
+        return False
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    @property
+    def closed(self):
+        return False
+
+
+def _blocos(df):
+    # A conversão de precisão é feita por bloco para não duplicar a série inteira na memória
+    for inicio in range(0, max(len(df), 1), EXPORTAR_LINHAS_POR_BLOCO):
+        yield inicio, restaurar_precisao(df.iloc[inicio:inicio + EXPORTAR_LINHAS_POR_BLOCO])
+
+def escrever_csv(df, destino):
+    for inicio, bloco in _blocos(df):
+        destino.write(bloco.to_csv(header=inicio == 0).encode('utf-8'))
+
+def escrever_ndjson(df, destino):
+    for _, bloco in _blocos(df):
+        if len(bloco):
+            linhas = bloco.reset_index().to_json(orient='records', lines=True, date_format='iso', force_ascii=False)
+            destino.write((linhas.rstrip('\n') + '\n').encode('utf-8'))
+
+def escrever_parquet(df, destino):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    for _, bloco in _blocos(df):
+        tabela = pa.Table.from_pandas(bloco, preserve_index=True)
+        if escritor is None:
+            escritor = pq.ParquetWriter(destino, tabela.schema)
+        escritor.write_table(tabela)
+    escritor.close()
+
+def escrever_xlsx(df, destino):
+    from openpyxl import Workbook
+
+    # Modo write-only: as linhas vão para disco temporário em vez de ficarem na memória
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet('Dados')
+    planilha.append([df.index.name or 'date', *df.columns])
+    for _, bloco in _blocos(df):
+        colunas = [bloco[coluna].tolist() for coluna in bloco.columns]
+        for data, *valores in zip(bloco.index.to_pydatetime(), *colunas):
+            planilha.append([data, *[None if valor != valor else valor for valor in valores]])
+    workbook.save(destino)
+
+ESCRITORES = {'csv': escrever_csv, 'ndjson': escrever_ndjson, 'parquet': escrever_parquet, 'xlsx': escrever_xlsx}
+
+def formato_disponivel(formato):
+    if formato == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+    return formato in ESCRITORES
+
+def nome_arquivo(lat, lon, formato):
+    return f"dados_meteorologicos_{lat}_{lon}.{FORMATOS[formato][1]}"
+
+def escrever_zip(locais, formato, destino, features=False):
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for lat, lon in locais:
+            try:
+                df = carregar_dados(lat, lon, features=features)
+            except Exception as e:
+                arquivo_zip.writestr(f"ERRO_{lat}_{lon}.txt", str(e))
+                continue
+            with arquivo_zip.open(nome_arquivo(lat, lon, formato), 'w', force_zip64=True) as entrada:
+                ESCRITORES[formato](df, _EntradaZip(entrada))
+
+def transmitir(escrever, *args):
+    # Executa o escritor numa thread produtora e entrega os bytes em blocos ao gerador da resposta
+    fluxo = FluxoFila(EXPORTAR_BYTES_POR_BLOCO, EXPORTAR_MAX_BLOCOS_FILA)
+
+    def produzir():
+        try:
+            escrever(*args, fluxo)
+            fluxo.finalizar()
+        except Exception as e:
+            if not fluxo.cancelado:
+                fluxo.falhar(e)
+
+    def gerar():
+        # A produtora só começa quando a resposta é consumida: um gerador nunca iniciado não deixa
+        # thread presa na fila; fechado no meio, blocos() marca o fluxo como cancelado e ela desiste
+        threading.Thread(target=produzir, daemon=True, name='exportacao').start()
+        yield from fluxo.blocos()
+
+    return gerar()
+
+def exportar_local(df, formato):
+    return transmitir(ESCRITORES[formato], df)
+
+def exportar_locais(locais, formato, features=False):
+    return transmitir(lambda destino: escrever_zip(locais, formato, destino, features))
@@ -0,0 +1,80 @@
+import math
+
+from config import GRADE_TIPO, GRADE_RESOLUCAO, GRADE_GEOHASH_PRECISAO
+
+BASE32_GEOHASH = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def validar_coordenadas(lat, lon):
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("Coordenadas fora do intervalo: latitude em [-90, 90] e longitude em [-180, 180].")
+
+
+class GradeRegular:
+    # Células de resolucao x resolucao graus; o id traz a resolução e os índices da célula
+    def __init__(self, resolucao):
+        self.resolucao = resolucao
+
+    def celula(self, lat, lon):
+        validar_coordenadas(lat, lon)
+        linhas = math.ceil(180 / self.resolucao)
+        colunas = math.ceil(360 / self.resolucao)
+        # Os polos e o antimeridiano caem na última célula em vez de abrir uma nova
+        i = min(int((lat + 90) // self.resolucao), linhas - 1)
+        j = min(int((lon + 180) // self.resolucao), colunas - 1)
+        return {
+            "id": f"r{self.resolucao:g}_{i}_{j}",
+            "latitude": round(-90 + (i + 0.5) * self.resolucao, 6),
+            "longitude": round(-180 + (j + 0.5) * self.resolucao, 6),
+            "resolucao": f"{self.resolucao:g}°",
+        }
+
+
+class GradeGeohash:
+    # Células geohash de `precisao` caracteres (5 ≈ 4,9 km x 4,9 km no equador)
+    def __init__(self, precisao):
+        self.precisao = precisao
+
+    def celula(self, lat, lon):
+        validar_coordenadas(lat, lon)
+        intervalo_lat, intervalo_lon = [-90.0, 90.0], [-180.0, 180.0]
+        caracteres = []
+        bits, valor, longitude = 0, 0, True
+        while len(caracteres) < self.precisao:
+            intervalo, coordenada = (intervalo_lon, lon) if longitude else (intervalo_lat, lat)
+            meio = (intervalo[0] + intervalo[1]) / 2
+            valor <<= 1
+            if coordenada >= meio:
+                valor |= 1
+                intervalo[0] = meio
+            else:
+                intervalo[1] = meio
+            longitude = not longitude
+            bits += 1
+            if bits == 5:
+                caracteres.append(BASE32_GEOHASH[valor])
+                bits, valor = 0, 0
+        return {
+            "id": ''.join(caracteres),
+            "latitude": round((intervalo_lat[0] + intervalo_lat[1]) / 2, 6),
+            "longitude": round((intervalo_lon[0] + intervalo_lon[1]) / 2, 6),
+            "resolucao": f"geohash{self.precisao}",
+        }
+
+
+GRADES = {
+    'grade': lambda: GradeRegular(GRADE_RESOLUCAO),
+    'geohash': lambda: GradeGeohash(GRADE_GEOHASH_PRECISAO),
+}
+
+def criar_grade(nome):
+    if nome not in GRADES:
+        raise ValueError(f"Grade desconhecida: {nome}. Use uma de: {', '.join(GRADES)}.")
+    return GRADES[nome]()
+
+
+grade = criar_grade(GRADE_TIPO)
+
+def celula(lat, lon):
+    # Célula canônica de uma coordenada: dados, modelos e previsões são compartilhados por célula
+    return grade.celula(lat, lon)
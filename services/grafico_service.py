@@ -0,0 +1,101 @@
+import hashlib
+import io
+import json
+
+import pandas as pd
+
+from config import HISTORICAL_LABEL, FUTURE_DATE_LABEL, PREDICTION_LABEL, TEMPERATURE_UNIT, COLUNAS_CLIMA, GRAFICOS_MAX_MEMORIA
+from services.cache_service import CacheMemoria, impressao_digital, restaurar_precisao
+from services.metricas_service import medir
+
+FORMATOS_GRAFICO = {'png': 'image/png', 'svg': 'image/svg+xml', 'json': 'application/json'}
+UNIDADES = {
+    'tavg': TEMPERATURE_UNIT,
+    'tmin': TEMPERATURE_UNIT,
+    'tmax': TEMPERATURE_UNIT,
+    'prcp': 'Precipitação (mm)',
+    'wspd': 'Velocidade do Vento (m/s)',
+    'pres': 'Pressão (hPa)',
+}
+
+
+# LRU em memória dos bytes já renderizados (PNG, SVG ou JSON), sem validade: a chave muda com os dados
+cache_graficos = CacheMemoria(GRAFICOS_MAX_MEMORIA)
+
+def chave_grafico(endpoint, df, data=None, formato='png', modelo=None):
+    return (endpoint, df.attrs.get('celula'), data, impressao_digital(df, COLUNAS_CLIMA), formato, modelo)
+
+def etag_grafico(chave):
+    return hashlib.sha1(repr(chave).encode()).hexdigest()
+
+def obter_ou_renderizar(chave, renderizar):
+    conteudo = cache_graficos.obter(chave)
+    if conteudo is None:
+        with medir('grafico_renderizacao'):
+            conteudo = renderizar()
+        cache_graficos.salvar(chave, conteudo)
+    return conteudo
+
+# matplotlib e seaborn são importados no primeiro gráfico renderizado
+def nova_figura(figsize):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def salvar_figura(fig, formato):
+    buf = io.BytesIO()
+    fig.savefig(buf, format=formato, bbox_inches='tight')
+    return buf.getvalue()
+
+def renderizar_previsao(df, previsoes, data_futura, formato='png'):
+    if formato == 'json':
+        return json.dumps({
+            "datas": [data.strftime('%Y-%m-%d') for data in df.index],
+            "series": {coluna: valores.tolist() for coluna, valores in restaurar_precisao(df[COLUNAS_CLIMA]).items()},
+            "unidades": UNIDADES,
+            "previsao": {"data": data_futura, "valores": previsoes},
+        }, ensure_ascii=False).encode('utf-8')
+
+    # API orientada a objetos (Figure + Agg), sem o estado global do pyplot
+    fig = nova_figura((15, 10))
+    axes = fig.subplots(3, 2).flatten()
+    data = pd.to_datetime(data_futura)
+
+    for ax, coluna in zip(axes, COLUNAS_CLIMA):
+        ax.plot(df.index, df[coluna], label=HISTORICAL_LABEL)
+        ax.axvline(data, color='red', linestyle='--', label=FUTURE_DATE_LABEL)
+        ax.scatter(data, previsoes[coluna], color='green', label=PREDICTION_LABEL)
+        ax.set_title(coluna.upper())
+        ax.set_xlabel('Data')
+        ax.set_ylabel(UNIDADES[coluna])
+        ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
+
+    fig.tight_layout()
+    return salvar_figura(fig, formato)
+
+def renderizar_analise(conf_matrix, feat_importances, formato='png'):
+    if formato == 'json':
+        return json.dumps({
+            "matriz_confusao": conf_matrix.tolist(),
+            "importancia_variaveis": feat_importances.to_dict(),
+        }, ensure_ascii=False).encode('utf-8')
+
+    import seaborn as sns
+
+    fig = nova_figura((12, 5))
+    axes = fig.subplots(1, 2)
+
+    sns.heatmap(conf_matrix, annot=True, fmt='d', cmap='Blues', ax=axes[0])
+    axes[0].set_title('Matriz de Confusão')
+    axes[0].set_xlabel('Previsto')
+    axes[0].set_ylabel('Real')
+
+    # Gráfico de Importância das Variáveis
+    feat_importances.sort_values().plot(kind='barh', ax=axes[1], color='teal')
+    axes[1].set_title('Importância das Variáveis')
+
+    fig.tight_layout()
+    return salvar_figura(fig, formato)
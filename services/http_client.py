@@ -0,0 +1,119 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_TIMEOUT_CONEXAO, HTTP_TIMEOUT_LEITURA, HTTP_TENTATIVAS, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, HTTP_POOL_MAX
+from services.cache_service import ChamadaUnica
+from services.metricas_service import duracao_upstream, registrar_tempo
+
+logger = logging.getLogger(__name__)
+
+STATUS_REPETIVEIS = {429, 500, 502, 503, 504}
+
+
+class ClienteHttp:
+    # Sessões keep-alive por host, com retentativas, agrupamento de chamadas idênticas e métricas por upstream
+    def __init__(self, timeout, tentativas, backoff_base, backoff_max, pool_max):
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_max = pool_max
+        self._sessoes = {}
+        self._metricas = {}
+        self._lock = threading.Lock()
+        self._chamada_unica = ChamadaUnica()
+
+    def get(self, url, headers=None, params=None, upstream=None, timeout=None):
+        upstream = upstream or urlsplit(url).hostname
+        chave = (url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items())))
+        return self._chamada_unica.executar(chave, self._get, url, headers, params, upstream, timeout or self.timeout)
+
+    def reiniciar(self):
+        # Conexões herdadas de outro processo (fork) não devem ser compartilhadas
+        with self._lock:
+            self._sessoes = {}
+
+    def estatisticas(self):
+        with self._lock:
+            return {upstream: dict(metricas) for upstream, metricas in self._metricas.items()}
+
+    @property
+    def agrupadas(self):
+        return self._chamada_unica.agrupadas
+
+    def _sessao(self, url):
+        partes = urlsplit(url)
+        host = f"{partes.scheme}://{partes.netloc}"
+        with self._lock:
+            sessao = self._sessoes.get(host)
+            if sessao is None:
+                sessao = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_max)
+                sessao.mount(f"{partes.scheme}://", adaptador)
+                self._sessoes[host] = sessao
+            return sessao
+
+    def _get(self, url, headers, params, upstream, timeout):
+        sessao = self._sessao(url)
+        for tentativa in range(self.tentativas + 1):
+            inicio = time.perf_counter()
+            try:
+                response = sessao.get(url, headers=headers, params=params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._registrar(upstream, time.perf_counter() - inicio, erro=True, retentativa=tentativa > 0, status='falha')
+                if tentativa == self.tentativas:
+                    raise
+                espera = self._backoff(tentativa)
+                logger.warning("Falha em %s (%s), nova tentativa em %.2fs", upstream, e, espera)
+                time.sleep(espera)
+                continue
+
+            repetir = response.status_code in STATUS_REPETIVEIS and tentativa < self.tentativas
+            self._registrar(upstream, time.perf_counter() - inicio, erro=response.status_code >= 400, retentativa=tentativa > 0, status=response.status_code)
+            if not repetir:
+                return response
+
+            espera = self._retry_after(response)
+            if espera is None:
+                espera = self._backoff(tentativa)
+            logger.warning("%s respondeu %s, nova tentativa em %.2fs", upstream, response.status_code, espera)
+            response.close()
+            time.sleep(espera)
+
+    def _backoff(self, tentativa):
+        # Backoff exponencial com jitter completo
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** tentativa))
+
+    def _retry_after(self, response):
+        valor = response.headers.get('Retry-After')
+        if not valor:
+            return None
+        try:
+            espera = float(valor)
+        except ValueError:
+            try:
+                espera = parsedate_to_datetime(valor).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(espera, 0.0), self.backoff_max)
+
+    def _registrar(self, upstream, duracao, erro, retentativa, status):
+        duracao_upstream.observar(duracao, upstream=upstream, status=status)
+        registrar_tempo(f'upstream_{upstream}', duracao)
+        with self._lock:
+            metricas = self._metricas.setdefault(upstream, {"requisicoes": 0, "erros": 0, "retentativas": 0, "latencia_total": 0.0, "latencia_max": 0.0})
+            metricas["requisicoes"] += 1
+            metricas["erros"] += int(erro)
+            metricas["retentativas"] += int(retentativa)
+            metricas["latencia_total"] += duracao
+            metricas["latencia_max"] = max(metricas["latencia_max"], duracao)
+
+
+cliente_http = ClienteHttp((HTTP_TIMEOUT_CONEXAO, HTTP_TIMEOUT_LEITURA), HTTP_TENTATIVAS, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, HTTP_POOL_MAX)
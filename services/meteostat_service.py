@@ -1,27 +1,147 @@
-import requests
+import logging
+
+import numpy as np
 import pandas as pd
-from config import API_URL, HEADERS
+from config import API_URL, HEADERS, COLUNAS_CLIMA, LIMITES_RISCO, JANELAS_MEDIAS_MOVEIS, METEOSTAT_INICIO, METEOSTAT_BLOCO_MESES, METEOSTAT_SOBREPOSICAO_MESES
+from services.cache_service import cache_series, ChamadaUnica
+from services.executores import executor_ingestao
+from services.grade_service import celula
+from services.http_client import cliente_http
+from services.metricas_service import medir
+
+logger = logging.getLogger(__name__)
+
+DATA_INICIO = METEOSTAT_INICIO
+chamada_ingestao = ChamadaUnica()
+
+def chave_dados(lat, lon):
+    # Uma série por célula da grade; sem a data final, a mesma série é estendida a cada atualização
+    return cache_series.chave(celula(lat, lon)["id"], DATA_INICIO)
+
+def fim_janela(hoje=None):
+    # Último dia do último mês completo: a janela acompanha a data atual sem o mês em andamento
+    hoje = pd.Timestamp(hoje or pd.Timestamp.today()).normalize()
+    return hoje.replace(day=1) - pd.Timedelta(days=1)
+
+def carregar_dados(lat, lon, features=False):
+    chave = chave_dados(lat, lon)
+    with medir('meteostat_cache'):
+        df = cache_series.obter(chave)
+
+    if df is None:
+        # A série é baixada no centro da célula, o mesmo para qualquer coordenada dentro dela;
+        # atualizações concorrentes da mesma célula são agrupadas
+        centro = celula(lat, lon)
+        df = chamada_ingestao.executar(chave, atualizar_serie, centro["latitude"], centro["longitude"], chave).copy(deep=False)
+
+    # Sem cópia quando a série já está em float32 (caso do cache)
+    df = df.astype('float32', copy=False)
+    df.attrs['celula'] = chave
+    df['risk'] = calcular_risco(df)
+
+    if features:
+        with medir('features'):
+            df = adicionar_features(df)
+
+    return df
+
+def atualizar_serie(lat, lon, chave, hoje=None):
+    # Ingestão incremental: a marca d'água é o último mês da série armazenada (mesmo vencida);
+    # só os meses seguintes, mais a sobreposição, são baixados e anexados
+    armazenada = cache_series.obter_expirado(chave)
+    inicio = pd.Timestamp(DATA_INICIO)
+    fim = fim_janela(hoje)
+    if armazenada is not None and len(armazenada):
+        marca_dagua = armazenada.index.max().replace(day=1)
+        inicio = max(inicio, marca_dagua + pd.DateOffset(months=1 - METEOSTAT_SOBREPOSICAO_MESES))
+
+    novos = None
+    if inicio <= fim:
+        try:
+            with medir('meteostat_download'):
+                novos = baixar_periodo(lat, lon, inicio, fim)
+        except Exception as e:
+            if armazenada is None or not len(armazenada):
+                raise
+            # Meteostat indisponível: a série vencida é servida sem renovar a validade, e a próxima
+            # requisição tenta a atualização de novo
+            logger.warning("Atualização da série %s falhou, usando a versão armazenada: %s", chave, e)
+            return armazenada
 
-def carregar_dados(lat, lon):
+    if armazenada is None or not len(armazenada):
+        df = novos
+    elif novos is None:
+        df = armazenada
+    else:
+        df = pd.concat([armazenada[armazenada.index < inicio], novos])
+
+    if df is None or df.empty:
+        raise ValueError("Erro ao obter dados da API Meteostat.")
+
+    # Salva mesmo sem meses novos para renovar a validade da série
+    cache_series.salvar(chave, df)
+    return df
+
+def blocos_periodo(inicio, fim, meses=None):
+    blocos = []
+    while inicio <= fim:
+        proximo = inicio + pd.DateOffset(months=meses or METEOSTAT_BLOCO_MESES)
+        blocos.append((inicio, min(fim, proximo - pd.Timedelta(days=1))))
+        inicio = proximo
+    return blocos
+
+def baixar_periodo(lat, lon, inicio, fim):
+    # Backfills longos são divididos em blocos de meses baixados em paralelo no pool de ingestão
+    blocos = blocos_periodo(inicio, fim)
+    if len(blocos) == 1:
+        partes = [baixar_dados(lat, lon, *blocos[0])]
+    else:
+        futuros = [executor_ingestao().submit(baixar_dados, lat, lon, bloco_inicio, bloco_fim) for bloco_inicio, bloco_fim in blocos]
+        partes = [futuro.result() for futuro in futuros]
+
+    partes = [parte for parte in partes if not parte.empty]
+    if not partes:
+        return None
+    return pd.concat(partes).sort_index()
+
+def baixar_dados(lat, lon, inicio, fim):
     params = {
         "lat": lat,
         "lon": lon,
-        "start": "2018-01-01",
-        "end": "2024-11-01",
+        "start": inicio.strftime('%Y-%m-%d'),
+        "end": fim.strftime('%Y-%m-%d'),
         "units": "metric"
     }
-    
-    response = requests.get(API_URL, headers=HEADERS, params=params)
+
+    response = cliente_http.get(API_URL, headers=HEADERS, params=params, upstream='meteostat')
     data = response.json()
 
     if 'data' in data:
         df = pd.DataFrame(data['data'])
+        if df.empty:
+            return df
         df['date'] = pd.to_datetime(df['date'])
         df.set_index('date', inplace=True)
-        df = df.dropna(subset=['tavg', 'tmin', 'tmax', 'prcp', 'wspd', 'pres'])
+        df = df.apply(pd.to_numeric, errors='coerce').astype('float32')
+        df = df.dropna(subset=COLUNAS_CLIMA)
     else:
         raise ValueError("Erro ao obter dados da API Meteostat.")
 
-    df['risk'] = df.apply(lambda row: 1 if row['tmax'] > 35 or row['prcp'] > 50 or row['wspd'] > 25 else 0, axis=1)
-    
     return df
+
+def calcular_risco(df, limites=None):
+    mascara = np.zeros(len(df), dtype=bool)
+    for coluna, limite in (limites or LIMITES_RISCO).items():
+        mascara |= df[coluna].to_numpy() > limite
+    return mascara.astype('int8')
+
+def adicionar_features(df, janelas=None):
+    # Médias móveis das variáveis climáticas e codificação cíclica do mês, calculadas em bloco
+    clima = df[COLUNAS_CLIMA]
+    blocos = [clima.rolling(janela, min_periods=1).mean().add_suffix(f'_media{janela}') for janela in (janelas or JANELAS_MEDIAS_MOVEIS)]
+    angulo = 2 * np.pi * df.index.month.to_numpy() / 12
+    blocos.append(pd.DataFrame({'mes_sen': np.sin(angulo), 'mes_cos': np.cos(angulo)}, index=df.index))
+    derivadas = pd.concat(blocos, axis=1).astype('float32')
+    resultado = pd.concat([df, derivadas], axis=1)
+    resultado.attrs = dict(df.attrs)
+    return resultado
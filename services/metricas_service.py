@@ -0,0 +1,146 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from config import METRICAS_BALDES
+
+# Métricas no formato texto do Prometheus, mantidas em memória por processo
+_metricas = []
+_tempos_requisicao = contextvars.ContextVar('tempos_requisicao', default=None)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores)) + (list(extra.items()) if extra else [])
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+def formatar(nome, tipo, descricao, amostras):
+    # amostras: lista de (rótulos, valor) com rótulos em dicionário
+    linhas = [f"# HELP {nome} {descricao}", f"# TYPE {nome} {tipo}"]
+    for rotulos, valor in amostras:
+        linhas.append(f"{nome}{_rotulos(list(rotulos), list(rotulos.values()))} {float(valor)!r}")
+    return linhas
+
+
+class Medidor:
+    # Valor que sobe e desce (ex.: requisições em andamento)
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+        _metricas.append(self)
+
+    def somar(self, valor=1, **rotulos):
+        chave = tuple(rotulos[nome] for nome in self.rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def exportar(self):
+        with self._lock:
+            valores = dict(self._valores)
+        return formatar(self.nome, 'gauge', self.descricao, [(dict(zip(self.rotulos, chave)), valor) for chave, valor in valores.items()])
+
+
+class Histograma:
+    # Contagem por balde (limites em segundos), soma e total de observações por combinação de rótulos
+    def __init__(self, nome, descricao, rotulos=(), baldes=None):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self.baldes = sorted(baldes or METRICAS_BALDES)
+        self._series = {}
+        self._lock = threading.Lock()
+        _metricas.append(self)
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(rotulos[nome] for nome in self.rotulos)
+        posicao = bisect.bisect_left(self.baldes, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = {"baldes": [0] * len(self.baldes), "soma": 0.0, "total": 0}
+            if posicao < len(self.baldes):
+                serie["baldes"][posicao] += 1
+            serie["soma"] += valor
+            serie["total"] += 1
+
+    def resumo(self):
+        # Soma e total de observações por combinação de rótulos (usado nos benchmarks)
+        with self._lock:
+            return {chave: (serie["soma"], serie["total"]) for chave, serie in self._series.items()}
+
+    def exportar(self):
+        with self._lock:
+            series = {chave: {**serie, "baldes": list(serie["baldes"])} for chave, serie in self._series.items()}
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} histogram"]
+        for chave, serie in series.items():
+            acumulado = 0
+            for limite, contagem in zip(self.baldes, serie["baldes"]):
+                acumulado += contagem
+                linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, chave, {'le': repr(float(limite))})} {acumulado}")
+            linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, chave, {'le': '+Inf'})} {serie['total']}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {serie['soma']!r}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, chave)} {serie['total']}")
+        return linhas
+
+
+class TemposRequisicao:
+    # Tempo acumulado por etapa durante uma requisição (cabeçalho Server-Timing)
+    def __init__(self):
+        self._tempos = {}
+        self._lock = threading.Lock()
+
+    def adicionar(self, etapa, duracao):
+        with self._lock:
+            self._tempos[etapa] = self._tempos.get(etapa, 0.0) + duracao
+
+    def server_timing(self):
+        with self._lock:
+            return ', '.join(f"{etapa};dur={duracao * 1000:.1f}" for etapa, duracao in self._tempos.items())
+
+
+duracao_etapa = Histograma('clima_api_etapa_segundos', 'Duração das etapas internas (dados, ajustes, previsões).', ['etapa'])
+duracao_upstream = Histograma('clima_api_upstream_segundos', 'Latência de cada tentativa de chamada a upstreams.', ['upstream', 'status'])
+duracao_requisicao = Histograma('clima_api_requisicao_segundos', 'Duração das requisições HTTP até o envio dos cabeçalhos.', ['rota', 'metodo', 'status'])
+requisicoes_em_andamento = Medidor('clima_api_requisicoes_em_andamento', 'Requisições HTTP em andamento.', ['rota'])
+
+
+def iniciar_requisicao():
+    return _tempos_requisicao.set(TemposRequisicao())
+
+def encerrar_requisicao(token):
+    _tempos_requisicao.reset(token)
+
+def tempos_requisicao():
+    return _tempos_requisicao.get()
+
+def registrar_tempo(etapa, duracao):
+    # Contabiliza no Server-Timing da requisição corrente (quando houver)
+    tempos = _tempos_requisicao.get()
+    if tempos is not None:
+        tempos.adicionar(etapa, duracao)
+
+@contextmanager
+def medir(etapa):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        duracao_etapa.observar(duracao, etapa=etapa)
+        registrar_tempo(etapa, duracao)
+
+def exportar(linhas_extras=()):
+    linhas = []
+    for metrica in _metricas:
+        linhas.extend(metrica.exportar())
+    linhas.extend(linhas_extras)
+    return '\n'.join(linhas) + '\n'
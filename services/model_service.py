@@ -1,19 +1,251 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from statistics import NormalDist
+
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from prophet import Prophet
+from config import (COLUNAS_CLIMA, COLUNAS_NAO_NEGATIVAS, PROPHET_DIR, PROPHET_MAX_MEMORIA, PROPHET_MAX_BYTES, PREVISAO_WORKERS, PREVISAO_TIMEOUT, PREVISAO_CONTEXTO,
+                    MODELO_PREVISAO, HARMONICO_ORDEM, INTERVALO_PREVISAO)
+from services.registro_modelos import RegistroModelos, registro_modelos
+from services.metricas_service import medir
+
+logger = logging.getLogger(__name__)
+
+HIPERPARAMETROS_FLORESTA = {"n_estimators": 100, "random_state": 42, "min_samples_leaf": 1, "max_features": 'sqrt'}
+HIPERPARAMETROS_PROPHET = {}
+EPOCA_HARMONICA = pd.Timestamp('2000-01-01')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# prophet/cmdstanpy e scikit-learn são importados no primeiro uso para reduzir o tempo de inicialização
+
+def salvar_prophet(modelo, caminho):
+    from prophet.serialize import model_to_json
+
+    with open(caminho, 'w') as f:
+        f.write(model_to_json(modelo))
+
+def carregar_prophet(caminho):
+    from prophet.serialize import model_from_json
+
+    with open(caminho) as f:
+        return model_from_json(f.read())
+
+registro_prophet = RegistroModelos(PROPHET_DIR, PROPHET_MAX_MEMORIA, PROPHET_MAX_BYTES, extensao='json', salvar=salvar_prophet, carregar=carregar_prophet)
 
 def treinar_modelo(df):
-    X = df[['tavg', 'tmin', 'tmax', 'prcp', 'wspd', 'pres']]
+    return registro_modelos.obter(df, COLUNAS_CLIMA + ['risk'], HIPERPARAMETROS_FLORESTA, ajustar_floresta)
+
+def ajustar_floresta(df, colunas, hiperparametros):
+    from sklearn.ensemble import RandomForestClassifier
+
+    X = df[COLUNAS_CLIMA]
     y = df['risk']
-    model = RandomForestClassifier(n_estimators=100, random_state=42, min_samples_leaf=1, max_features='sqrt')
-    model.fit(X, y)
+    model = RandomForestClassifier(**hiperparametros)
+    with medir('floresta_ajuste'):
+        model.fit(X, y)
     return model
 
-def prever_variavel(df, coluna, data_futura):
-    prophet_df = df[[coluna]].reset_index()
+def ajustar_prophet(df, colunas, hiperparametros):
+    from prophet import Prophet
+
+    prophet_df = df[colunas].reset_index()
     prophet_df.columns = ['ds', 'y']
-    modelo = Prophet()
-    modelo.fit(prophet_df)
-    futuro = pd.DataFrame({'ds': [data_futura]})
-    previsao = modelo.predict(futuro)
-    return previsao['yhat'].values[0]
+    modelo = Prophet(**hiperparametros)
+    with medir('prophet_ajuste'):
+        modelo.fit(prophet_df)
+    return modelo
+
+def ajustar_prophet_serializado(ds, y, hiperparametros, prazo=None):
+    # Executado nos processos do pool: recebe apenas a série da coluna e devolve o modelo em JSON.
+    # prazo (time.time() do lote): o próprio cmdstanpy encerra o otimizador ao esgotá-lo, liberando o processo
+    from prophet import Prophet
+    from prophet.serialize import model_to_json
+
+    opcoes = {}
+    if prazo is not None:
+        restante = prazo - time.time()
+        if restante <= 0:
+            raise TimeoutError("Prazo do lote esgotado antes do ajuste.")
+        opcoes['timeout'] = restante
+    modelo = Prophet(**hiperparametros)
+    modelo.fit(pd.DataFrame({'ds': ds, 'y': y}), **opcoes)
+    return model_to_json(modelo)
+
+def executor_previsao():
+    global _executor
+    if PREVISAO_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            metodos = multiprocessing.get_all_start_methods()
+            contexto = multiprocessing.get_context(PREVISAO_CONTEXTO if PREVISAO_CONTEXTO in metodos else 'spawn')
+            workers = max(1, min(PREVISAO_WORKERS, os.cpu_count() or 1))
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=contexto)
+        return _executor
+
+def descartar_executor(encerrar=True, alvo=None):
+    # encerrar=False após um fork: o pool herdado não pode ser encerrado pelo processo filho.
+    # alvo: só descarta se ainda for o pool atual (não derruba um pool novo criado por outra thread)
+    global _executor
+    with _executor_lock:
+        if alvo is None or alvo is _executor:
+            alvo, _executor = _executor, None
+    if alvo is not None and encerrar:
+        alvo.shutdown(wait=False, cancel_futures=True)
+
+def ajustar_prophets(df, colunas, progresso=None):
+    # progresso(etapa), se informado, é chamado à medida que o modelo de cada coluna fica pronto
+    from prophet.serialize import model_from_json
+
+    modelos = {}
+    pendentes = []
+    for coluna in colunas:
+        modelo = registro_prophet.buscar(df, [coluna], HIPERPARAMETROS_PROPHET)
+        if modelo is None:
+            pendentes.append(coluna)
+        else:
+            modelos[coluna] = modelo
+            if progresso:
+                progresso(f'previsao_{coluna}')
+
+    esgotadas = []
+    executor = executor_previsao() if len(pendentes) > 1 else None
+    if executor is not None:
+        futuros = {}
+        # Um único prazo vale para o lote inteiro, aqui e nos processos do pool
+        prazo = time.time() + PREVISAO_TIMEOUT
+        try:
+            for coluna in pendentes:
+                serie = df[coluna]
+                futuros[coluna] = executor.submit(ajustar_prophet_serializado, serie.index.values, serie.to_numpy(), HIPERPARAMETROS_PROPHET, prazo)
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.warning("Pool de previsão indisponível, usando modo serial: %s", e)
+            descartar_executor(alvo=executor)
+
+        # Tempo de parede das colunas ajustadas em paralelo
+        with medir('prophet_ajuste_pool'):
+            em_andamento = {futuro: coluna for coluna, futuro in futuros.items()}
+            while em_andamento:
+                prontos, _ = wait(em_andamento, timeout=max(0.0, prazo - time.time()), return_when=FIRST_COMPLETED)
+                if not prontos:
+                    # Os ajustes ainda na fila são cancelados; os em andamento terminam pelo prazo no próprio processo
+                    for futuro, coluna in em_andamento.items():
+                        futuro.cancel()
+                        esgotadas.append(coluna)
+                    break
+                for futuro in prontos:
+                    coluna = em_andamento.pop(futuro)
+                    try:
+                        modelo = model_from_json(futuro.result())
+                    except TimeoutError:
+                        esgotadas.append(coluna)
+                        continue
+                    except BrokenProcessPool as e:
+                        logger.warning("Pool de previsão falhou, usando modo serial: %s", e)
+                        descartar_executor(alvo=executor)
+                        continue
+                    registro_prophet.registrar(df, [coluna], HIPERPARAMETROS_PROPHET, modelo)
+                    modelos[coluna] = modelo
+                    if progresso:
+                        progresso(f'previsao_{coluna}')
+
+    if esgotadas:
+        # Sem recurso ao modo serial: ele bloquearia a requisição de novo, sem limite de tempo
+        raise TimeoutError(f"Tempo esgotado ({PREVISAO_TIMEOUT:g} s) ajustando o Prophet para: {', '.join(esgotadas)}.")
+
+    # Modo serial: colunas sem pool ou com falha no pool
+    for coluna in pendentes:
+        if coluna not in modelos:
+            modelos[coluna] = registro_prophet.obter(df, [coluna], HIPERPARAMETROS_PROPHET, ajustar_prophet)
+            if progresso:
+                progresso(f'previsao_{coluna}')
+    return modelos
+
+def prever_prophet(df, colunas, datas, progresso=None):
+    # Um modelo Prophet por coluna, ajustado uma única vez por (célula, coluna)
+    modelos = ajustar_prophets(df, colunas, progresso)
+    futuro = pd.DataFrame({'ds': pd.to_datetime(datas)})
+    previsoes = {}
+    with medir('prophet_predict'):
+        for coluna in colunas:
+            previsao = modelos[coluna].predict(futuro)
+            previsoes[coluna] = {
+                "yhat": previsao['yhat'].to_numpy(),
+                "inferior": previsao['yhat_lower'].to_numpy(),
+                "superior": previsao['yhat_upper'].to_numpy(),
+            }
+    return previsoes
+
+def matriz_harmonica(datas, ordem, centro):
+    # Intercepto, tendência linear e pares seno/cosseno das harmônicas anuais (tempo em anos)
+    anos = (pd.DatetimeIndex(datas) - EPOCA_HARMONICA).days.to_numpy() / 365.25
+    colunas = [np.ones_like(anos), anos - centro]
+    for k in range(1, ordem + 1):
+        angulo = 2 * np.pi * k * anos
+        colunas += [np.sin(angulo), np.cos(angulo)]
+    return np.column_stack(colunas)
+
+def ajustar_harmonico(df, colunas, ordem=None):
+    # Mínimos quadrados com todas as colunas na mesma resolução: Y (n x c) = X (n x p) @ B (p x c)
+    ordem = ordem or HARMONICO_ORDEM
+    centro = float(((df.index - EPOCA_HARMONICA).days.to_numpy() / 365.25).mean())
+    X = matriz_harmonica(df.index, ordem, centro)
+    Y = df[colunas].to_numpy(dtype='float64')
+    coeficientes = np.linalg.lstsq(X, Y, rcond=None)[0]
+    residuos = Y - X @ coeficientes
+    sigma = np.sqrt((residuos ** 2).sum(axis=0) / max(len(Y) - X.shape[1], 1))
+    return {"colunas": list(colunas), "ordem": ordem, "centro": centro, "coeficientes": coeficientes, "sigma": sigma, "covariancia": np.linalg.pinv(X.T @ X)}
+
+def prever_harmonico(df, colunas, datas, progresso=None):
+    with medir('harmonico_ajuste'):
+        modelo = ajustar_harmonico(df, colunas)
+        X = matriz_harmonica(pd.to_datetime(datas), modelo["ordem"], modelo["centro"])
+        yhat = X @ modelo["coeficientes"]
+        # Intervalo de previsão: variância residual mais a incerteza dos coeficientes em cada data
+        alavanca = np.einsum('ij,jk,ik->i', X, modelo["covariancia"], X)
+        margem = NormalDist().inv_cdf(0.5 + INTERVALO_PREVISAO / 2) * np.sqrt(1 + alavanca)[:, None] * modelo["sigma"][None, :]
+    previsoes = {}
+    for j, coluna in enumerate(colunas):
+        previsoes[coluna] = {"yhat": yhat[:, j], "inferior": yhat[:, j] - margem[:, j], "superior": yhat[:, j] + margem[:, j]}
+        if progresso:
+            progresso(f'previsao_{coluna}')
+    return previsoes
+
+MOTORES_PREVISAO = {'prophet': prever_prophet, 'harmonico': prever_harmonico}
+
+def validar_modelo(modelo):
+    modelo = (modelo or MODELO_PREVISAO).strip().lower()
+    if modelo not in MOTORES_PREVISAO:
+        raise ValueError(f"Modelo inválido. Use um de: {', '.join(MOTORES_PREVISAO)}.")
+    return modelo
+
+def limitar_nao_negativas(previsoes):
+    # Os intervalos dos dois motores são simétricos: sem o corte, chuva e vento teriam limites negativos
+    for coluna in COLUNAS_NAO_NEGATIVAS:
+        if coluna in previsoes:
+            previsoes[coluna] = {chave: np.maximum(np.asarray(valores, dtype='float64'), 0.0) for chave, valores in previsoes[coluna].items()}
+    return previsoes
+
+def prever_intervalos(df, colunas, datas, progresso=None, modelo=None, limitar=True):
+    # Estimativa pontual e intervalo de previsão de cada coluna, em listas alinhadas às datas.
+    # limitar=False devolve o intervalo simétrico do motor, sem o corte em 0
+    previsoes = MOTORES_PREVISAO[validar_modelo(modelo)](df, colunas, list(datas), progresso)
+    if limitar:
+        previsoes = limitar_nao_negativas(previsoes)
+    return {coluna: {chave: [float(valor) for valor in valores] for chave, valores in previsao.items()} for coluna, previsao in previsoes.items()}
+
+def prever_variaveis(df, colunas, data_futura, progresso=None, modelo=None):
+    # Aceita uma data ou uma lista de datas e devolve só as estimativas pontuais
+    varias_datas = isinstance(data_futura, (list, tuple))
+    previsoes = prever_intervalos(df, colunas, data_futura if varias_datas else [data_futura], progresso, modelo)
+    return {coluna: previsao["yhat"] if varias_datas else previsao["yhat"][0] for coluna, previsao in previsoes.items()}
+
+def prever_variavel(df, coluna, data_futura, modelo=None):
+    return prever_variaveis(df, [coluna], data_futura, modelo=modelo)[coluna]
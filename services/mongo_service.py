@@ -0,0 +1,192 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from config import (MONGO_URI, MONGO_DB, MONGO_COLLECTION, MONGO_POOL_MAX, MONGO_POOL_MIN, MONGO_IDLE_MS, MONGO_TIMEOUT_MS,
+                    MONGO_LOTE, MONGO_INTERVALO_SEGUNDOS, MONGO_BUFFER_MAX, MONGO_ESPERA_BUFFER_SEGUNDOS, MONGO_PAUSA_LEITURA_SEGUNDOS)
+
+logger = logging.getLogger(__name__)
+
+_colecao = None
+_colecao_lock = threading.Lock()
+
+def obter_colecao():
+    # Cliente criado no primeiro uso, com pool explícito e índice composto garantido uma vez
+    global _colecao
+    with _colecao_lock:
+        if _colecao is None:
+            from pymongo import MongoClient
+
+            client = MongoClient(
+                MONGO_URI,
+                maxPoolSize=MONGO_POOL_MAX,
+                minPoolSize=MONGO_POOL_MIN,
+                maxIdleTimeMS=MONGO_IDLE_MS,
+                serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+            )
+            definir_colecao(client[MONGO_DB][MONGO_COLLECTION])
+        return _colecao
+
+def definir_colecao(colecao):
+    # Permite usar outra coleção (por exemplo, um substituto em memória nos benchmarks)
+    global _colecao
+    from pymongo import ASCENDING
+
+    colecao.create_index([("origem", ASCENDING), ("destino", ASCENDING), ("data", ASCENDING)], name="origem_destino_data")
+    _colecao = colecao
+
+
+def reiniciar_conexao():
+    # O MongoClient não é seguro para fork: cada worker cria o seu no primeiro uso
+    global _colecao
+    with _colecao_lock:
+        _colecao = None
+    escritor_sugestoes.reiniciar()
+
+
+class LeiturasMongo:
+    # Acertos, falhas e erros das leituras de cache no MongoDB; após um erro, as leituras ficam em pausa
+    def __init__(self, pausa):
+        self.pausa = pausa
+        self._lock = threading.Lock()
+        self._pausado_ate = 0.0
+        self.acertos = 0
+        self.falhas = 0
+        self.erros = 0
+
+    def disponivel(self):
+        return time.monotonic() >= self._pausado_ate
+
+    def registrar(self, encontrado):
+        with self._lock:
+            if encontrado:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+
+    def registrar_erro(self):
+        # Erro conta como falha de cache: a requisição segue para o cálculo
+        with self._lock:
+            self.erros += 1
+            self.falhas += 1
+            self._pausado_ate = time.monotonic() + self.pausa
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {"acertos": self.acertos, "falhas": self.falhas, "erros": self.erros, "taxa_acerto": self.acertos / total if total else 0.0}
+
+
+class EscritorBuffer:
+    # Fila limitada esvaziada com insert_many por tamanho de lote ou por tempo
+    def __init__(self, colecao, tamanho_lote, intervalo, max_buffer, espera):
+        self._colecao = colecao
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.espera = espera
+        self._fila = queue.Queue(maxsize=max_buffer)
+        self._thread = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self.escritos = 0
+        self.escritas_sincronas = 0
+        self.falhas = 0
+
+    def enfileirar(self, documento):
+        from bson import ObjectId
+
+        documento.setdefault("_id", ObjectId())
+        self._iniciar()
+        try:
+            self._fila.put(documento, timeout=self.espera)
+        except queue.Full:
+            # Backpressure: com o buffer cheio, a própria requisição grava o documento
+            self._colecao().insert_one(documento)
+            with self._lock:
+                self.escritas_sincronas += 1
+        return documento["_id"]
+
+    def descarregar(self):
+        # Na saída, a thread termina de gravar o lote que já retirou da fila antes de o restante ser gravado aqui
+        self._parar.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join()
+        lote = []
+        while True:
+            try:
+                lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        self._gravar(lote)
+
+    def reiniciar(self):
+        with self._lock:
+            self._thread = None
+            self._parar = threading.Event()
+
+    def pendentes(self):
+        return self._fila.qsize()
+
+    def _iniciar(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._executar, daemon=True, name='mongo_escritor')
+                    self._thread.start()
+
+    def _executar(self):
+        parar = self._parar
+        while not parar.is_set():
+            try:
+                lote = [self._fila.get(timeout=self.intervalo)]
+            except queue.Empty:
+                continue
+            limite = time.monotonic() + self.intervalo
+            while len(lote) < self.tamanho_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0 or parar.is_set():
+                    break
+                try:
+                    lote.append(self._fila.get(timeout=restante))
+                except queue.Empty:
+                    break
+            self._gravar(lote)
+
+    def _gravar(self, lote):
+        if not lote:
+            return
+        try:
+            self._colecao().insert_many(lote, ordered=False)
+            with self._lock:
+                self.escritos += len(lote)
+        except Exception as e:
+            with self._lock:
+                self.falhas += len(lote)
+            logger.error("Falha ao gravar %d sugestões no MongoDB: %s", len(lote), e)
+
+
+leituras_sugestoes = LeiturasMongo(MONGO_PAUSA_LEITURA_SEGUNDOS)
+escritor_sugestoes = EscritorBuffer(obter_colecao, MONGO_LOTE, MONGO_INTERVALO_SEGUNDOS, MONGO_BUFFER_MAX, MONGO_ESPERA_BUFFER_SEGUNDOS)
+atexit.register(escritor_sugestoes.descarregar)
+
+def salvar_sugestao(sugestao):
+    return escritor_sugestoes.enfileirar(sugestao)
+
+def buscar_sugestao(origem_id, destino_id, data, max_idade=None, modelo=None):
+    from bson import ObjectId
+    from pymongo import DESCENDING
+
+    filtro = {"origem": origem_id, "destino": destino_id, "data": data}
+    if modelo is not None:
+        filtro["modelo"] = modelo
+    if max_idade is not None:
+        # O ObjectId carrega o instante de criação, o que dispensa um campo de data extra
+        filtro["_id"] = {"$gte": ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=max_idade))}
+    documento = obter_colecao().find_one(filtro, sort=[("_id", DESCENDING)])
+    if documento is not None:
+        documento["_id"] = str(documento["_id"])
+    return documento
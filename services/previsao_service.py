@@ -0,0 +1,93 @@
+from concurrent.futures import as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from config import COLUNAS_CLIMA
+from services.cache_service import ChamadaUnica
+from services.executores import executor_cpu, executor_io
+from services.grade_service import celula
+from services.meteostat_service import carregar_dados, chave_dados
+from services.model_service import treinar_modelo, prever_intervalos, validar_modelo
+
+chamada_previsao = ChamadaUnica()
+
+def rotulo_risco(risco):
+    return "Alto" if risco == 1 else "Baixo"
+
+def prever_local(lat, lon, datas, progresso=None, modelo=None):
+    if progresso is None:
+        # Previsões concorrentes da mesma célula, datas e modelo são calculadas uma única vez
+        chave = (chave_dados(lat, lon), tuple(datas), validar_modelo(modelo))
+        return [dict(resultado) for resultado in chamada_previsao.executar(chave, calcular_local, lat, lon, datas, None, modelo)]
+    return calcular_local(lat, lon, datas, progresso, modelo)
+
+def calcular_local(lat, lon, datas, progresso=None, modelo=None):
+    df = carregar_dados(lat, lon)
+    if progresso:
+        progresso('dados')
+    return prever_dados(df, datas, progresso, modelo)
+
+def prever_dados(df, datas, progresso=None, modelo=None):
+    # Floresta e modelos de previsão são obtidos uma vez; todas as datas saem de uma única previsão
+    model = treinar_modelo(df)
+    if progresso:
+        progresso('treino')
+    datas = list(datas)
+    previsoes = prever_intervalos(df, COLUNAS_CLIMA, datas, progresso, modelo)
+    riscos = model.predict(pd.DataFrame({coluna: previsoes[coluna]["yhat"] for coluna in COLUNAS_CLIMA}, columns=COLUNAS_CLIMA))
+    return [
+        {
+            "data": data,
+            "previsao": {coluna: previsoes[coluna]["yhat"][i] for coluna in COLUNAS_CLIMA},
+            "intervalo": {coluna: [previsoes[coluna]["inferior"][i], previsoes[coluna]["superior"][i]] for coluna in COLUNAS_CLIMA},
+            "risco": rotulo_risco(riscos[i]),
+            "modelo": validar_modelo(modelo)
+        }
+        for i, data in enumerate(datas)
+    ]
+
+def agrupar_por_local(itens):
+    # Agrupa itens válidos pela célula de dados; itens inválidos retornam como erros
+    grupos = {}
+    erros = []
+    for indice, item in enumerate(itens):
+        try:
+            lat = float(item['lat'])
+            lon = float(item['lon'])
+            data = item['data']
+            datetime.strptime(data, '%Y-%m-%d')
+        except (KeyError, TypeError, ValueError):
+            erros.append({"indice": indice, "erro": "Cada item precisa de 'lat', 'lon' e 'data' no formato YYYY-MM-DD."})
+            continue
+        try:
+            celula_item = celula(lat, lon)
+        except ValueError as e:
+            erros.append({"indice": indice, "erro": str(e)})
+            continue
+        grupo = grupos.setdefault(chave_dados(lat, lon), {"lat": lat, "lon": lon, "celula": celula_item, "itens": []})
+        grupo["itens"].append((indice, lat, lon, data))
+    return grupos, erros
+
+def prever_grupo(grupo, modelo=None):
+    # Carga no pool de I/O; ajuste e previsão no pool de CPU
+    datas = sorted({data for _, _, _, data in grupo["itens"]})
+    df = carregar_dados(grupo["lat"], grupo["lon"])
+    resultados = {resultado["data"]: resultado for resultado in executor_cpu().submit(prever_dados, df, datas, None, modelo).result()}
+    return [
+        {"indice": indice, "localizacao": {"latitude": lat, "longitude": lon}, "celula": grupo["celula"], **resultados[data]}
+        for indice, lat, lon, data in grupo["itens"]
+    ]
+
+def prever_lote(itens, modelo=None):
+    # Gera os resultados de cada localização conforme ficam prontos
+    grupos, erros = agrupar_por_local(itens)
+    yield from erros
+
+    futuros = {executor_io().submit(prever_grupo, grupo, modelo): grupo for grupo in grupos.values()}
+    for futuro in as_completed(futuros):
+        try:
+            yield from futuro.result()
+        except Exception as e:
+            for indice, lat, lon, data in futuros[futuro]["itens"]:
+                yield {"indice": indice, "localizacao": {"latitude": lat, "longitude": lon}, "data": data, "erro": str(e)}
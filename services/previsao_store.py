@@ -0,0 +1,71 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import PREVISOES_DB, PREVISOES_VALIDADE_SEGUNDOS
+from services.meteostat_service import chave_dados
+
+
+class ArmazemPrevisoes:
+    # Armazenamento chave-valor (SQLite) das previsões pré-calculadas por célula e data
+    def __init__(self, caminho, validade):
+        self.caminho = caminho
+        self.validade = validade
+        self._local = threading.local()
+
+    def buscar(self, lat, lon, data):
+        linha = self._conexao().execute(
+            "SELECT resultado, atualizado_em FROM previsoes WHERE chave = ?", (self._chave(lat, lon, data),)
+        ).fetchone()
+        if linha is None or time.time() - linha[1] >= self.validade:
+            return None
+        return json.loads(linha[0])
+
+    def datas_frescas(self, lat, lon, datas):
+        chaves = {self._chave(lat, lon, data): data for data in datas}
+        limite = time.time() - self.validade
+        frescas = set()
+        lista = list(chaves)
+        # Consulta em lotes para respeitar o limite de parâmetros do SQLite
+        for inicio in range(0, len(lista), 500):
+            bloco = lista[inicio:inicio + 500]
+            marcadores = ','.join('?' * len(bloco))
+            for (chave,) in self._conexao().execute(
+                f"SELECT chave FROM previsoes WHERE atualizado_em > ? AND chave IN ({marcadores})", (limite, *bloco)
+            ):
+                frescas.add(chaves[chave])
+        return frescas
+
+    def salvar(self, lat, lon, resultados):
+        agora = time.time()
+        conexao = self._conexao()
+        with conexao:
+            conexao.executemany(
+                "INSERT OR REPLACE INTO previsoes (chave, data, resultado, atualizado_em) VALUES (?, ?, ?, ?)",
+                [(self._chave(lat, lon, r['data']), r['data'], json.dumps(r), agora) for r in resultados]
+            )
+
+    def remover_antigas(self, antes_de):
+        conexao = self._conexao()
+        with conexao:
+            conexao.execute("DELETE FROM previsoes WHERE data < ?", (antes_de,))
+
+    def _chave(self, lat, lon, data):
+        return f"{chave_dados(lat, lon)}|{data}"
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, timeout=30)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS previsoes (chave TEXT PRIMARY KEY, data TEXT, resultado TEXT, atualizado_em REAL)"
+            )
+            self._local.conexao = conexao
+        return conexao
+
+
+armazem_previsoes = ArmazemPrevisoes(PREVISOES_DB, PREVISOES_VALIDADE_SEGUNDOS)
@@ -0,0 +1,182 @@
+import os
+import threading
+from collections import OrderedDict
+
+from config import MODELOS_DIR, MODELOS_MAX_MEMORIA, MODELOS_MAX_BYTES
+from services.cache_service import impressao_digital
+
+
+class RegistroModelos:
+    # Guarda modelos ajustados por impressão digital dos dados de treino e hiperparâmetros
+    def __init__(self, diretorio, max_memoria, max_bytes=None, extensao='joblib', salvar=None, carregar=None):
+        self.diretorio = diretorio
+        self.max_memoria = max_memoria
+        self.max_bytes = max_bytes
+        self.extensao = extensao
+        self._salvar = salvar or salvar_joblib
+        self._carregar = carregar or carregar_joblib
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._locks_treino = {}
+        self.acertos = 0
+        self.carregamentos = 0
+        self.treinos = 0
+
+    def obter(self, df, colunas, hiperparametros, treinar):
+        impressao = impressao_digital(df, colunas, hiperparametros=hiperparametros)
+        with self._lock:
+            modelo = self._buscar_memoria(impressao)
+            if modelo is not None:
+                return modelo
+            lock_treino = self._locks_treino.setdefault(impressao, threading.Lock())
+
+        # Apenas uma thread treina cada impressão; as demais aguardam e reutilizam o resultado
+        with lock_treino:
+            try:
+                with self._lock:
+                    modelo = self._buscar_memoria(impressao)
+                if modelo is None:
+                    modelo = self._carregar_disco(impressao)
+                if modelo is None:
+                    modelo = treinar(df, colunas, hiperparametros)
+                    self._salvar_disco(impressao, modelo)
+                    with self._lock:
+                        self.treinos += 1
+                with self._lock:
+                    self._guardar_memoria(impressao, modelo)
+            finally:
+                # Também com falha no treino ou na gravação: o lock não fica para sempre no dicionário
+                with self._lock:
+                    self._locks_treino.pop(impressao, None)
+        return modelo
+
+    def buscar(self, df, colunas, hiperparametros):
+        # Consulta memória e disco sem treinar
+        impressao = impressao_digital(df, colunas, hiperparametros=hiperparametros)
+        with self._lock:
+            modelo = self._buscar_memoria(impressao)
+        if modelo is None:
+            modelo = self._carregar_disco(impressao)
+            if modelo is not None:
+                with self._lock:
+                    self._guardar_memoria(impressao, modelo)
+        return modelo
+
+    def registrar(self, df, colunas, hiperparametros, modelo):
+        # Registra um modelo treinado fora do registro (por exemplo, em outro processo)
+        impressao = impressao_digital(df, colunas, hiperparametros=hiperparametros)
+        self._salvar_disco(impressao, modelo)
+        with self._lock:
+            self.treinos += 1
+            self._guardar_memoria(impressao, modelo)
+
+    def invalidar(self, impressao=None):
+        with self._lock:
+            if impressao is None:
+                self._memoria.clear()
+            else:
+                self._memoria.pop(impressao, None)
+        if impressao is None:
+            arquivos = os.listdir(self.diretorio) if os.path.isdir(self.diretorio) else []
+        else:
+            arquivos = [f"{impressao}.{self.extensao}"]
+        for arquivo in arquivos:
+            try:
+                os.remove(os.path.join(self.diretorio, arquivo))
+            except OSError:
+                pass
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "acertos_memoria": self.acertos,
+                "carregamentos_disco": self.carregamentos,
+                "treinos": self.treinos,
+                "itens_memoria": len(self._memoria),
+            }
+
+    def _caminho(self, impressao):
+        return os.path.join(self.diretorio, f"{impressao}.{self.extensao}")
+
+    def _buscar_memoria(self, impressao):
+        modelo = self._memoria.get(impressao)
+        if modelo is not None:
+            self._memoria.move_to_end(impressao)
+            self.acertos += 1
+        return modelo
+
+    def _guardar_memoria(self, impressao, modelo):
+        self._memoria[impressao] = modelo
+        self._memoria.move_to_end(impressao)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _carregar_disco(self, impressao):
+        caminho = self._caminho(impressao)
+        if not os.path.exists(caminho):
+            return None
+        try:
+            modelo = self._carregar(caminho)
+            # Atualiza o mtime do arquivo para a política LRU do disco
+            os.utime(caminho)
+        except (OSError, EOFError, ValueError):
+            return None
+        with self._lock:
+            self.carregamentos += 1
+        return modelo
+
+    def _salvar_disco(self, impressao, modelo):
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self._caminho(impressao)
+        temporario = f"{caminho}.tmp{os.getpid()}_{threading.get_ident()}"
+        self._salvar(modelo, temporario)
+        os.replace(temporario, caminho)
+        self._evictar_disco()
+
+    def _evictar_disco(self):
+        if self.max_bytes is None:
+            return
+        entradas = []
+        total = 0
+        try:
+            nomes = os.listdir(self.diretorio)
+        except OSError:
+            return
+        for nome in nomes:
+            caminho = os.path.join(self.diretorio, nome)
+            if '.tmp' in nome or not nome.endswith(f".{self.extensao}"):
+                continue
+            try:
+                tamanho = os.path.getsize(caminho)
+                entradas.append((os.path.getmtime(caminho), tamanho, caminho))
+            except OSError:
+                continue
+            total += tamanho
+
+        for _, tamanho, caminho in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+            total -= tamanho
+
+
+def salvar_joblib(modelo, caminho):
+    import joblib
+
+    joblib.dump(modelo, caminho)
+
+
+def carregar_joblib(caminho):
+    import joblib
+
+    try:
+        # Arrays das árvores ficam mapeados em memória e compartilhados entre processos
+        return joblib.load(caminho, mmap_mode='r')
+    except ValueError:
+        return joblib.load(caminho)
+
+
+registro_modelos = RegistroModelos(MODELOS_DIR, MODELOS_MAX_MEMORIA, MODELOS_MAX_BYTES)
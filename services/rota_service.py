@@ -0,0 +1,253 @@
+import logging
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from geopy.distance import great_circle
+
+from config import COLUNAS_CLIMA, LIMITES_RISCO, INTERVALO_PREVISAO, ROTA_CACHE_MAX, ROTA_CACHE_TTL_SEGUNDOS, CORREDOR_PONTOS
+from services.aeroapi_service import obter_coordenadas_aeroporto, obter_rotas_aeroporto
+from services.grade_service import celula
+from services.meteostat_service import carregar_dados
+from services.model_service import treinar_modelo, prever_intervalos, prever_variaveis, validar_modelo
+from services.mongo_service import salvar_sugestao, buscar_sugestao, leituras_sugestoes
+from services.cache_service import CacheMemoria, ChamadaUnica
+from services.executores import executor_cpu, executor_io
+
+logger = logging.getLogger(__name__)
+cache_sugestoes = CacheMemoria(ROTA_CACHE_MAX, ROTA_CACHE_TTL_SEGUNDOS)
+# Risco por (célula, data, modelo) dos pontos do corredor, compartilhado entre rotas que cruzam a mesma célula
+cache_riscos_corredor = CacheMemoria(ROTA_CACHE_MAX * max(CORREDOR_PONTOS, 1), ROTA_CACHE_TTL_SEGUNDOS)
+chamada_sugestao = ChamadaUnica()
+
+def etapas_sugestao():
+    # Etapas informadas a progresso(etapa) durante o cálculo de uma sugestão
+    etapas = []
+    for prefixo in ('origem', 'destino'):
+        etapas += [f'{prefixo}_coordenadas', f'{prefixo}_dados', f'{prefixo}_treino']
+        etapas += [f'{prefixo}_previsao_{coluna}' for coluna in COLUNAS_CLIMA]
+    return etapas + ['corredor', 'rotas']
+
+def medir_etapa(tempos, etapa, funcao, *args, progresso=None):
+    inicio = time.perf_counter()
+    try:
+        resultado = funcao(*args)
+    finally:
+        tempos[etapa] = round((time.perf_counter() - inicio) * 1000, 1)
+    if progresso:
+        progresso(etapa)
+    return resultado
+
+def classificar(model, previsoes):
+    # Classe prevista e probabilidade de risco alto (0 se a floresta só viu a classe baixa)
+    X = pd.DataFrame(previsoes, index=[0])[COLUNAS_CLIMA]
+    classes = list(model.classes_)
+    probabilidade = float(model.predict_proba(X)[0][classes.index(1)]) if 1 in classes else 0.0
+    return model.predict(X)[0], probabilidade
+
+def calcular_risco_local(prefixo, df, data_futura, tempos, progresso=None, modelo=None):
+    model = medir_etapa(tempos, f'{prefixo}_treino', treinar_modelo, df, progresso=progresso)
+    progresso_coluna = (lambda etapa: progresso(f'{prefixo}_{etapa}')) if progresso else None
+    previsoes = medir_etapa(tempos, f'{prefixo}_previsao', prever_variaveis, df, COLUNAS_CLIMA, data_futura, progresso_coluna, modelo)
+    return classificar(model, previsoes)
+
+def avaliar_aeroporto(prefixo, lat, lon, data_futura, tempos, progresso=None, modelo=None):
+    # Ramo de um aeroporto: dados (pool de I/O) -> floresta -> previsões -> risco (pool de CPU)
+    df = medir_etapa(tempos, f'{prefixo}_dados', carregar_dados, lat, lon, progresso=progresso)
+    return executor_cpu().submit(calcular_risco_local, prefixo, df, data_futura, tempos, progresso, modelo).result()
+
+def risco_limites(df, data_futura, modelo=None):
+    # Corredor: só as variáveis que definem o rótulo de risco são previstas, e o rótulo sai direto
+    # dos limites (sem floresta). A probabilidade é a de exceder algum limite, pelo intervalo de previsão;
+    # o sigma vem do intervalo sem o corte em 0, que encolheria a metade inferior de chuva e vento.
+    previsoes = prever_intervalos(df, list(LIMITES_RISCO), [data_futura], modelo=modelo, limitar=False)
+    z = NormalDist().inv_cdf(0.5 + INTERVALO_PREVISAO / 2)
+    alto = False
+    dentro_dos_limites = 1.0
+    for coluna, limite in LIMITES_RISCO.items():
+        yhat, superior = previsoes[coluna]["yhat"][0], previsoes[coluna]["superior"][0]
+        alto = alto or yhat > limite
+        sigma = (superior - yhat) / z
+        excede = 1 - NormalDist(yhat, sigma).cdf(limite) if sigma > 0 else float(yhat > limite)
+        dentro_dos_limites *= 1 - excede
+    return int(alto), 1 - dentro_dos_limites
+
+def avaliar_celula(lat, lon, data_futura, modelo=None):
+    df = carregar_dados(lat, lon)
+    return executor_cpu().submit(risco_limites, df, data_futura, modelo).result()
+
+def pontos_corredor(origem, destino, n):
+    # n pontos intermediários igualmente espaçados no grande círculo (interpolação esférica)
+    lat, lon = np.radians([origem[0], destino[0]]), np.radians([origem[1], destino[1]])
+    vetores = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+    angulo = np.arccos(np.clip(vetores[0] @ vetores[1], -1.0, 1.0))
+    if n <= 0 or angulo < 1e-9:
+        return []
+    fracoes = np.arange(1, n + 1) / (n + 1)
+    pontos = (np.sin((1 - fracoes) * angulo)[:, None] * vetores[0] + np.sin(fracoes * angulo)[:, None] * vetores[1]) / np.sin(angulo)
+    latitudes = np.degrees(np.arcsin(np.clip(pontos[:, 2], -1.0, 1.0)))
+    longitudes = np.degrees(np.arctan2(pontos[:, 1], pontos[:, 0]))
+    return [(round(float(la), 6), round(float(lo), 6)) for la, lo in zip(latitudes, longitudes)]
+
+def avaliar_corredor(celulas, data_futura, modelo=None):
+    # Células já avaliadas vêm do cache; as demais são submetidas de uma vez (dados no pool de I/O, risco no pool de CPU)
+    riscos = {}
+    futuros = {}
+    for celula_id, centro in celulas.items():
+        em_cache = cache_riscos_corredor.obter((celula_id, data_futura, modelo))
+        if em_cache is not None:
+            riscos[celula_id] = em_cache
+        else:
+            futuros[celula_id] = executor_io().submit(avaliar_celula, centro["latitude"], centro["longitude"], data_futura, modelo)
+    for celula_id, futuro in futuros.items():
+        try:
+            riscos[celula_id] = futuro.result()
+            cache_riscos_corredor.salvar((celula_id, data_futura, modelo), riscos[celula_id])
+        except Exception as e:
+            # Células sem dados (ex.: sobre o oceano) não derrubam a sugestão: o segmento fica sem avaliação
+            logger.warning("Célula %s do corredor sem avaliação: %s", celula_id, e)
+            riscos[celula_id] = None
+    return riscos
+
+def perfil_rota(pontos, riscos):
+    # pontos: (lat, lon, célula) da origem ao destino; um segmento por par de pontos consecutivos
+    segmentos = []
+    acumulada = 0.0
+    for i, (inicio, fim) in enumerate(zip(pontos, pontos[1:])):
+        distancia = great_circle(inicio[:2], fim[:2]).km
+        acumulada += distancia
+        avaliados = [riscos[ponto[2]] for ponto in (inicio, fim) if riscos[ponto[2]] is not None]
+        if avaliados:
+            probabilidade = round(max(avaliado[1] for avaliado in avaliados), 3)
+            risco = "Alto" if any(classe == 1 for classe, _ in avaliados) else "Baixo"
+        else:
+            probabilidade, risco = None, "Indisponível"
+        segmentos.append({
+            "segmento": i,
+            "inicio": {"latitude": inicio[0], "longitude": inicio[1], "celula": inicio[2]},
+            "fim": {"latitude": fim[0], "longitude": fim[1], "celula": fim[2]},
+            "distancia_km": round(distancia, 1),
+            "distancia_acumulada_km": round(acumulada, 1),
+            "risco": risco,
+            "probabilidade_risco": probabilidade,
+        })
+    return segmentos
+
+def sugerir_rota(origem_id, destino_id, data_futura, reutilizar=True, progresso=None, modelo=None):
+    # Cache de leitura: memória -> MongoDB -> cálculo, com requisições idênticas concorrentes agrupadas
+    modelo = validar_modelo(modelo)
+    chave = (origem_id, destino_id, data_futura, modelo)
+    if reutilizar:
+        em_memoria = cache_sugestoes.obter(chave)
+        if em_memoria is not None:
+            return {**sem_tempos(em_memoria), "cache": "memoria"}
+    if progresso:
+        # Cálculo com progresso pode ser cancelado no meio: não é compartilhado com outras requisições
+        return obter_ou_calcular_sugestao(origem_id, destino_id, data_futura, reutilizar, progresso, modelo)
+    return dict(chamada_sugestao.executar((chave, reutilizar), obter_ou_calcular_sugestao, origem_id, destino_id, data_futura, reutilizar, None, modelo))
+
+def sem_tempos(sugestao):
+    # Os tempos são do cálculo original: numa resposta vinda do cache eles não descrevem a requisição
+    return {campo: valor for campo, valor in sugestao.items() if campo != 'tempos_ms'}
+
+def ler_sugestao_armazenada(origem_id, destino_id, data_futura, modelo):
+    # O MongoDB é só cache de leitura: indisponível, a sugestão é calculada em vez de a requisição falhar
+    from pymongo.errors import PyMongoError
+
+    if not leituras_sugestoes.disponivel():
+        leituras_sugestoes.registrar(False)
+        return None
+    try:
+        armazenada = buscar_sugestao(origem_id, destino_id, data_futura, max_idade=ROTA_CACHE_TTL_SEGUNDOS, modelo=modelo)
+    except PyMongoError as e:
+        logger.warning("Leitura de sugestão no MongoDB falhou, calculando: %s", e)
+        leituras_sugestoes.registrar_erro()
+        return None
+    leituras_sugestoes.registrar(armazenada is not None)
+    return armazenada
+
+def obter_ou_calcular_sugestao(origem_id, destino_id, data_futura, reutilizar, progresso=None, modelo=None):
+    modelo = validar_modelo(modelo)
+    chave = (origem_id, destino_id, data_futura, modelo)
+    if reutilizar:
+        armazenada = ler_sugestao_armazenada(origem_id, destino_id, data_futura, modelo)
+        if armazenada is not None:
+            cache_sugestoes.salvar(chave, armazenada)
+            return {**sem_tempos(armazenada), "cache": "mongo"}
+
+    sugestao_rota = calcular_sugestao(origem_id, destino_id, data_futura, progresso, modelo)
+    cache_sugestoes.salvar(chave, sugestao_rota)
+    return {**sugestao_rota, "cache": None}
+
+def calcular_sugestao(origem_id, destino_id, data_futura, progresso=None, modelo=None):
+    # Origem, destino, células do corredor e consulta de rotas são independentes e rodam em paralelo
+    modelo = validar_modelo(modelo)
+    tempos = {}
+    inicio = time.perf_counter()
+    futuro_rotas = executor_io().submit(medir_etapa, tempos, 'rotas', obter_rotas_aeroporto, origem_id, destino_id, progresso=progresso)
+    futuro_coordenadas_origem = executor_io().submit(medir_etapa, tempos, 'origem_coordenadas', obter_coordenadas_aeroporto, origem_id, progresso=progresso)
+    futuro_coordenadas_destino = executor_io().submit(medir_etapa, tempos, 'destino_coordenadas', obter_coordenadas_aeroporto, destino_id, progresso=progresso)
+    lat_origem, lon_origem = futuro_coordenadas_origem.result()
+    lat_destino, lon_destino = futuro_coordenadas_destino.result()
+    celula_origem = celula(lat_origem, lon_origem)["id"]
+    celula_destino = celula(lat_destino, lon_destino)["id"]
+
+    futuro_origem = executor_io().submit(avaliar_aeroporto, 'origem', lat_origem, lon_origem, data_futura, tempos, progresso, modelo)
+    futuro_destino = executor_io().submit(avaliar_aeroporto, 'destino', lat_destino, lon_destino, data_futura, tempos, progresso, modelo)
+
+    # Pontos intermediários no grande círculo, agrupados por célula: cada célula é avaliada uma única vez
+    inicio_corredor = time.perf_counter()
+    intermediarios = [(lat, lon, celula(lat, lon)) for lat, lon in pontos_corredor((lat_origem, lon_origem), (lat_destino, lon_destino), CORREDOR_PONTOS)]
+    distintas = {dados["id"]: dados for _, _, dados in intermediarios if dados["id"] not in (celula_origem, celula_destino)}
+    riscos = avaliar_corredor(distintas, data_futura, modelo)
+    tempos['corredor'] = round((time.perf_counter() - inicio_corredor) * 1000, 1)
+    if progresso:
+        progresso('corredor')
+
+    risco_origem, _ = futuro_origem.result()
+    risco_destino, _ = futuro_destino.result()
+    # O perfil avalia todas as células pelos limites, inclusive origem e destino: o risco da floresta fica só
+    # em risco_origem/risco_destino. Os modelos dessas células já foram ajustados acima; resta só prever.
+    extremos = {celula_origem: celula(lat_origem, lon_origem), celula_destino: celula(lat_destino, lon_destino)}
+    riscos.update(avaliar_corredor(extremos, data_futura, modelo))
+    rotas = futuro_rotas.result()
+    tempos['total'] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    pontos = [(lat_origem, lon_origem, celula_origem)] + [(lat, lon, dados["id"]) for lat, lon, dados in intermediarios] + [(lat_destino, lon_destino, celula_destino)]
+    segmentos = perfil_rota(pontos, riscos)
+    pior_segmento = max(segmentos, key=lambda segmento: (segmento["risco"] == "Alto", segmento["probabilidade_risco"] or 0.0))
+    risco_corredor = any(riscos[celula_id] is not None and riscos[celula_id][0] == 1 for celula_id in distintas)
+
+    # Definir a sugestão de rota com base nos riscos
+    if risco_origem == 1 or risco_destino == 1:
+        sugestao = "Evitar voo devido a alto risco meteorológico."
+    elif risco_corredor:
+        sugestao = f"Evitar voo devido a alto risco meteorológico em rota (segmento {pior_segmento['segmento']})."
+    else:
+        sugestao = "Rota segura. Risco meteorológico baixo."
+
+    sugestao_rota = {
+        "origem": origem_id,
+        "destino": destino_id,
+        "data": data_futura,
+        "modelo": modelo,
+        "coordenadas": {
+            "origem": {"latitude": lat_origem, "longitude": lon_origem, "celula": celula_origem},
+            "destino": {"latitude": lat_destino, "longitude": lon_destino, "celula": celula_destino},
+        },
+        "risco_origem": "Alto" if risco_origem == 1 else "Baixo",
+        "risco_destino": "Alto" if risco_destino == 1 else "Baixo",
+        "risco_corredor": "Alto" if risco_corredor else "Baixo",
+        "perfil_rota": segmentos,
+        "pior_segmento": pior_segmento,
+        "rotas": rotas,
+        "sugestao": sugestao
+    }
+
+    # Gravação assíncrona em lote; o _id é gerado no cliente para já constar na resposta
+    sugestao_rota["_id"] = str(salvar_sugestao(dict(sugestao_rota)))
+
+    logger.info("sugerir_rota %s->%s %s tempos(ms)=%s", origem_id, destino_id, data_futura, tempos)
+    sugestao_rota["tempos_ms"] = tempos
+    return sugestao_rota
@@ -0,0 +1,308 @@
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from config import COLUNAS_CLIMA, LOTE_MAX_ITENS, MODELO_PREVISAO, TAREFAS_ARMAZEM, TAREFAS_DB, TAREFAS_MAX_PENDENTES, TAREFAS_TTL_SEGUNDOS
+from services.executores import executor_tarefas
+from services.grade_service import celula, validar_coordenadas
+from services.model_service import validar_modelo
+from services.previsao_service import prever_local
+from services.previsao_store import armazem_previsoes
+from services.rota_service import etapas_sugestao, sugerir_rota
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_FINAIS = {'concluida', 'falhou', 'cancelada'}
+
+
+class TarefaCancelada(Exception):
+    pass
+
+
+class FilaCheia(Exception):
+    pass
+
+
+class ArmazemTarefasMemoria:
+    # Armazenamento padrão, no próprio processo: só o worker que recebeu a tarefa a enxerga
+    def __init__(self):
+        self._tarefas = {}
+        self._lock = threading.Lock()
+
+    def salvar(self, tarefa):
+        with self._lock:
+            self._tarefas[tarefa['id']] = copy.deepcopy(tarefa)
+
+    def obter(self, tarefa_id):
+        with self._lock:
+            tarefa = self._tarefas.get(tarefa_id)
+            return copy.deepcopy(tarefa) if tarefa is not None else None
+
+    def atualizar(self, tarefa_id, funcao):
+        # Aplica funcao(tarefa) de forma atômica e devolve a tarefa atualizada
+        with self._lock:
+            tarefa = self._tarefas.get(tarefa_id)
+            if tarefa is None:
+                return None
+            funcao(tarefa)
+            return copy.deepcopy(tarefa)
+
+    def remover_expiradas(self, agora):
+        with self._lock:
+            for tarefa_id in [tarefa_id for tarefa_id, tarefa in self._tarefas.items() if tarefa['expira_em'] <= agora]:
+                del self._tarefas[tarefa_id]
+
+
+class ArmazemTarefasSqlite:
+    # Compartilhado pelos processos da máquina (workers do gunicorn): qualquer um consulta ou cancela a tarefa
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+
+    def salvar(self, tarefa):
+        conexao = self._conexao()
+        with conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO tarefas (id, dados, expira_em) VALUES (?, ?, ?)",
+                (tarefa['id'], json.dumps(tarefa), tarefa['expira_em'])
+            )
+
+    def obter(self, tarefa_id):
+        linha = self._conexao().execute("SELECT dados FROM tarefas WHERE id = ?", (tarefa_id,)).fetchone()
+        return json.loads(linha[0]) if linha is not None else None
+
+    def atualizar(self, tarefa_id, funcao):
+        conexao = self._conexao()
+        with conexao:
+            conexao.execute("BEGIN IMMEDIATE")
+            linha = conexao.execute("SELECT dados FROM tarefas WHERE id = ?", (tarefa_id,)).fetchone()
+            if linha is None:
+                return None
+            tarefa = json.loads(linha[0])
+            funcao(tarefa)
+            conexao.execute("UPDATE tarefas SET dados = ?, expira_em = ? WHERE id = ?", (json.dumps(tarefa), tarefa['expira_em'], tarefa_id))
+            return tarefa
+
+    def remover_expiradas(self, agora):
+        conexao = self._conexao()
+        with conexao:
+            conexao.execute("DELETE FROM tarefas WHERE expira_em <= ?", (agora,))
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, timeout=30)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("CREATE TABLE IF NOT EXISTS tarefas (id TEXT PRIMARY KEY, dados TEXT, expira_em REAL)")
+            self._local.conexao = conexao
+        return conexao
+
+
+ARMAZENS_TAREFAS = {
+    'memoria': ArmazemTarefasMemoria,
+    'sqlite': lambda: ArmazemTarefasSqlite(TAREFAS_DB),
+}
+
+
+class GerenciadorTarefas:
+    # Executa tarefas longas no pool local; estado, progresso por etapa e resultado ficam no armazém até expirar
+    def __init__(self, armazem, ttl, max_pendentes):
+        self.armazem = armazem
+        self.ttl = ttl
+        self.max_pendentes = max_pendentes
+        self._tipos = {}
+        self._futuros = {}
+        self._lock = threading.Lock()
+
+    def registrar_tipo(self, tipo, validar, executar, etapas):
+        # validar(corpo) -> parâmetros (ValueError se inválido); executar(parametros, progresso) -> resultado
+        self._tipos[tipo] = (validar, executar, etapas)
+
+    def tipos(self):
+        return list(self._tipos)
+
+    def submeter(self, tipo, corpo):
+        if tipo not in self._tipos:
+            raise ValueError(f"Tipo de tarefa inválido. Use um de: {', '.join(self._tipos)}.")
+        validar, executar, etapas = self._tipos[tipo]
+        parametros = validar(corpo)
+
+        agora = time.time()
+        self.armazem.remover_expiradas(agora)
+        tarefa = {
+            "id": uuid.uuid4().hex,
+            "tipo": tipo,
+            "parametros": parametros,
+            "estado": "pendente",
+            "progresso": 0.0,
+            "etapas": {etapa: None for etapa in etapas(parametros)},
+            "resultado": None,
+            "erro": None,
+            "criada_em": agora,
+            "iniciada_em": None,
+            "finalizada_em": None,
+            # Também vale para tarefas órfãs (processo encerrado antes de concluir)
+            "expira_em": agora + self.ttl,
+        }
+
+        with self._lock:
+            if len(self._futuros) >= self.max_pendentes:
+                raise FilaCheia(f"Limite de {self.max_pendentes} tarefas em andamento atingido. Tente novamente mais tarde.")
+            self.armazem.salvar(tarefa)
+            self._futuros[tarefa["id"]] = executor_tarefas().submit(self._executar, tarefa["id"], executar, parametros)
+        return tarefa
+
+    def obter(self, tarefa_id):
+        tarefa = self.armazem.obter(tarefa_id)
+        if tarefa is None or tarefa["expira_em"] <= time.time():
+            return None
+        return tarefa
+
+    def cancelar(self, tarefa_id):
+        tarefa = self.armazem.atualizar(tarefa_id, self._marcar_cancelamento)
+        with self._lock:
+            futuro = self._futuros.get(tarefa_id)
+            if futuro is not None and futuro.cancel():
+                self._futuros.pop(tarefa_id, None)
+        return tarefa
+
+    def pendentes(self):
+        with self._lock:
+            return len(self._futuros)
+
+    def _executar(self, tarefa_id, executar, parametros):
+        inicio = time.perf_counter()
+        try:
+            tarefa = self.armazem.atualizar(tarefa_id, self._iniciar)
+            if tarefa is None or tarefa["estado"] != "executando":
+                return
+
+            def progresso(etapa):
+                # Chamado pelos serviços ao fim de cada etapa; também é o ponto de cancelamento cooperativo
+                decorrido = round(time.perf_counter() - inicio, 3)
+                atualizada = self.armazem.atualizar(tarefa_id, lambda t: self._concluir_etapa(t, etapa, decorrido))
+                if atualizada is None or atualizada["estado"] == "cancelando":
+                    raise TarefaCancelada(f"Tarefa {tarefa_id} cancelada.")
+
+            try:
+                resultado = executar(parametros, progresso)
+            except TarefaCancelada:
+                self.armazem.atualizar(tarefa_id, lambda t: self._finalizar(t, "cancelada"))
+            except Exception as e:
+                logger.exception("Tarefa %s falhou", tarefa_id)
+                self.armazem.atualizar(tarefa_id, lambda t: self._finalizar(t, "falhou", erro=str(e)))
+            else:
+                self.armazem.atualizar(tarefa_id, lambda t: self._finalizar(t, "concluida", resultado=resultado))
+        finally:
+            with self._lock:
+                self._futuros.pop(tarefa_id, None)
+
+    def _iniciar(self, tarefa):
+        if tarefa["estado"] == "pendente":
+            tarefa["estado"] = "executando"
+            tarefa["iniciada_em"] = time.time()
+
+    def _concluir_etapa(self, tarefa, etapa, decorrido):
+        tarefa["etapas"][etapa] = decorrido
+        concluidas = sum(1 for valor in tarefa["etapas"].values() if valor is not None)
+        tarefa["progresso"] = round(concluidas / len(tarefa["etapas"]), 3)
+
+    def _marcar_cancelamento(self, tarefa):
+        if tarefa["estado"] == "pendente":
+            self._finalizar(tarefa, "cancelada")
+        elif tarefa["estado"] == "executando":
+            # Interrompida na próxima etapa concluída
+            tarefa["estado"] = "cancelando"
+
+    def _finalizar(self, tarefa, estado, resultado=None, erro=None):
+        if tarefa["estado"] == "cancelando":
+            estado, resultado = "cancelada", None
+        if tarefa["estado"] in ESTADOS_FINAIS:
+            return
+        agora = time.time()
+        tarefa["estado"] = estado
+        tarefa["resultado"] = resultado
+        tarefa["erro"] = erro
+        tarefa["finalizada_em"] = agora
+        tarefa["expira_em"] = agora + self.ttl
+        if estado == "concluida":
+            tarefa["progresso"] = 1.0
+
+
+def criar_armazem(nome):
+    if nome not in ARMAZENS_TAREFAS:
+        raise ValueError(f"TAREFAS_ARMAZEM inválido: {nome}. Use um de: {', '.join(ARMAZENS_TAREFAS)}.")
+    return ARMAZENS_TAREFAS[nome]()
+
+
+gerenciador_tarefas = GerenciadorTarefas(criar_armazem(TAREFAS_ARMAZEM), TAREFAS_TTL_SEGUNDOS, TAREFAS_MAX_PENDENTES)
+
+
+# Tipos de tarefa: previsão de um local (uma ou mais datas) e sugestão de rota
+
+def validar_data(data):
+    try:
+        datetime.strptime(data, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError("Formato de data inválido. Use YYYY-MM-DD.")
+    return data
+
+def validar_previsao(corpo):
+    try:
+        lat = float(corpo['lat'])
+        lon = float(corpo['lon'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Os parâmetros 'lat', 'lon' e 'data' (ou 'datas') são obrigatórios.")
+    datas = corpo.get('datas') or ([corpo['data']] if corpo.get('data') else None)
+    if not isinstance(datas, list) or not datas:
+        raise ValueError("Os parâmetros 'lat', 'lon' e 'data' (ou 'datas') são obrigatórios.")
+    if len(datas) > LOTE_MAX_ITENS:
+        raise ValueError(f"A tarefa aceita no máximo {LOTE_MAX_ITENS} datas.")
+    validar_coordenadas(lat, lon)
+    return {"lat": lat, "lon": lon, "datas": sorted({validar_data(data) for data in datas}), "modelo": validar_modelo(corpo.get('modelo'))}
+
+def etapas_previsao(parametros):
+    return ['dados', 'treino'] + [f'previsao_{coluna}' for coluna in COLUNAS_CLIMA]
+
+def executar_previsao(parametros, progresso):
+    lat, lon, modelo = parametros["lat"], parametros["lon"], parametros["modelo"]
+    # Datas já pré-calculadas pelo agendador (modelo padrão) não são recalculadas
+    usar_armazem = modelo == MODELO_PREVISAO
+    resultados = {data: armazem_previsoes.buscar(lat, lon, data) if usar_armazem else None for data in parametros["datas"]}
+    pendentes = [data for data, resultado in resultados.items() if resultado is None]
+    if pendentes:
+        for resultado in prever_local(lat, lon, pendentes, progresso, modelo):
+            resultados[resultado["data"]] = resultado
+    return {
+        "localizacao": {"latitude": lat, "longitude": lon},
+        "celula": celula(lat, lon),
+        "previsoes": [resultados[data] for data in parametros["datas"]],
+    }
+
+def validar_rota(corpo):
+    if not corpo.get('origem_id') or not corpo.get('destino_id') or not corpo.get('data'):
+        raise ValueError("Os parâmetros 'origem_id', 'destino_id' e 'data' são obrigatórios.")
+    return {
+        "origem_id": str(corpo['origem_id']),
+        "destino_id": str(corpo['destino_id']),
+        "data": validar_data(corpo['data']),
+        "reutilizar": str(corpo.get('reutilizar', True)).lower() != 'false',
+        "modelo": validar_modelo(corpo.get('modelo')),
+    }
+
+def etapas_rota(parametros):
+    return etapas_sugestao()
+
+def executar_rota(parametros, progresso):
+    return sugerir_rota(parametros["origem_id"], parametros["destino_id"], parametros["data"], reutilizar=parametros["reutilizar"], progresso=progresso, modelo=parametros["modelo"])
+
+
+gerenciador_tarefas.registrar_tipo('previsao', validar_previsao, executar_previsao, etapas_previsao)
+gerenciador_tarefas.registrar_tipo('sugerir_rota', validar_rota, executar_rota, etapas_rota)
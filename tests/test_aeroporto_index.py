@@ -0,0 +1,34 @@
+import threading
+
+import pandas as pd
+
+from services.aeroporto_index import IndiceAeroportos
+
+
+def test_adicionar_nao_duplica_o_mesmo_icao(tmp_path):
+    arquivo = tmp_path / "aeroportos.csv"
+    indice = IndiceAeroportos(str(arquivo))
+    indice.adicionar('SBGR', 'GRU', 'Guarulhos', -23.435556, -46.473056)
+    # Mesma resposta da AeroAPI obtida por outro código (IATA) e por falhas simultâneas
+    threads = [threading.Thread(target=indice.adicionar, args=('sbgr', 'gru', 'Guarulhos', -23.435556, -46.473056)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    indice.adicionar('SBSP', 'CGH', 'Congonhas', -23.626111, -46.656389)
+
+    assert len(pd.read_csv(arquivo)) == 2
+    assert indice.coordenadas('GRU') == indice.coordenadas('SBGR') == (-23.435556, -46.473056)
+    proximos = indice.mais_proximos(-23.5, -46.5, k=2)
+    assert [aeroporto['icao'] for aeroporto in proximos] == ['SBGR', 'SBSP']
+
+def test_carregar_descarta_icao_repetido_no_arquivo(tmp_path):
+    arquivo = tmp_path / "aeroportos.csv"
+    arquivo.write_text(
+        "icao,iata,nome,latitude,longitude\n"
+        "SBGR,GRU,Guarulhos,-23.435556,-46.473056\n"
+        "SBGR,GRU,Guarulhos,-23.435556,-46.473056\n"
+        "SBSP,CGH,Congonhas,-23.626111,-46.656389\n"
+    )
+    proximos = IndiceAeroportos(str(arquivo)).mais_proximos(-23.5, -46.5, k=3)
+    assert [aeroporto['icao'] for aeroporto in proximos] == ['SBGR', 'SBSP']
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import COLUNAS_CLIMA
+from services import meteostat_service
+from services.cache_service import CacheSeries
+
+
+def serie(inicio, meses):
+    datas = pd.date_range(inicio, periods=meses, freq='MS', name='date')
+    return pd.DataFrame(np.ones((meses, len(COLUNAS_CLIMA)), dtype='float32'), index=datas, columns=COLUNAS_CLIMA)
+
+@pytest.fixture
+def cache_vencido(tmp_path, monkeypatch):
+    # ttl=0: toda série armazenada já está vencida e passa pela atualização incremental
+    cache = CacheSeries(str(tmp_path / "series"), 0, 1024 * 1024, 8, dtype='float32')
+    monkeypatch.setattr(meteostat_service, 'cache_series', cache)
+    return cache
+
+def falhar(*args):
+    raise ConnectionError("Meteostat indisponível")
+
+
+def test_falha_no_download_usa_a_serie_vencida(cache_vencido, monkeypatch):
+    cache_vencido.salvar('celula', serie('2020-01-01', 24))
+    monkeypatch.setattr(meteostat_service, 'baixar_periodo', falhar)
+    df = meteostat_service.atualizar_serie(0.0, 0.0, 'celula', hoje='2023-06-15')
+    assert len(df) == 24
+
+def test_falha_sem_serie_armazenada_propaga(cache_vencido, monkeypatch):
+    monkeypatch.setattr(meteostat_service, 'baixar_periodo', falhar)
+    with pytest.raises(ConnectionError):
+        meteostat_service.atualizar_serie(0.0, 0.0, 'celula', hoje='2023-06-15')
@@ -0,0 +1,131 @@
+import threading
+import time
+
+from services.mongo_service import EscritorBuffer
+
+
+class ColecaoMemoria:
+    # Substituto mínimo da coleção: só as operações de escrita usadas pelo EscritorBuffer e consultas por igualdade
+    def __init__(self):
+        self._documentos = []
+        self._lock = threading.Lock()
+
+    def insert_one(self, documento):
+        with self._lock:
+            self._documentos.append(dict(documento))
+
+    def insert_many(self, documentos, ordered=True):
+        with self._lock:
+            self._documentos.extend(dict(documento) for documento in documentos)
+
+    def find_one(self, filtro):
+        with self._lock:
+            return next((dict(documento) for documento in self._documentos if self._corresponde(documento, filtro)), None)
+
+    def count_documents(self, filtro):
+        with self._lock:
+            return sum(1 for documento in self._documentos if self._corresponde(documento, filtro))
+
+    def _corresponde(self, documento, filtro):
+        return all(documento.get(campo) == valor for campo, valor in filtro.items())
+
+
+class ColecaoRegistrada(ColecaoMemoria):
+    # Registra o tamanho de cada insert_many; com `liberar`, o insert_many da thread do escritor fica bloqueado até o evento
+    def __init__(self, liberar=None):
+        super().__init__()
+        self.lotes = []
+        self.iniciado = threading.Event()
+        self.liberar = liberar
+
+    def insert_many(self, documentos, ordered=True):
+        self.iniciado.set()
+        if self.liberar is not None and threading.current_thread().name == 'mongo_escritor':
+            self.liberar.wait(5)
+        self.lotes.append(len(documentos))
+        super().insert_many(documentos, ordered)
+
+
+def criar_escritor(colecao, tamanho_lote=100, intervalo=0.5, max_buffer=100, espera=0.5):
+    return EscritorBuffer(lambda: colecao, tamanho_lote, intervalo, max_buffer, espera)
+
+def aguardar(condicao, limite=5.0):
+    fim = time.monotonic() + limite
+    while not condicao():
+        if time.monotonic() > fim:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_agrupa_documentos_em_lotes_pelo_tamanho():
+    colecao = ColecaoRegistrada()
+    escritor = criar_escritor(colecao, tamanho_lote=5, intervalo=0.5)
+    for i in range(10):
+        escritor.enfileirar({"i": i})
+    # Os 10 documentos chegam bem antes do intervalo: só o tamanho do lote dispara a gravação
+    assert aguardar(lambda: escritor.escritos == 10)
+    assert colecao.lotes == [5, 5]
+    assert colecao.count_documents({}) == 10
+    escritor.descarregar()
+
+def test_grava_lote_incompleto_apos_o_intervalo():
+    colecao = ColecaoRegistrada()
+    escritor = criar_escritor(colecao, tamanho_lote=100, intervalo=0.05)
+    for i in range(3):
+        escritor.enfileirar({"i": i})
+    assert aguardar(lambda: escritor.escritos == 3)
+    assert sum(colecao.lotes) == 3
+    assert escritor.pendentes() == 0
+    escritor.descarregar()
+
+def test_enfileirar_devolve_o_id_do_documento():
+    colecao = ColecaoRegistrada()
+    escritor = criar_escritor(colecao, intervalo=0.05)
+    _id = escritor.enfileirar({"origem": "SBGR"})
+    assert aguardar(lambda: escritor.escritos == 1)
+    assert colecao.find_one({"_id": _id})["origem"] == "SBGR"
+    escritor.descarregar()
+
+def test_buffer_cheio_grava_na_propria_requisicao():
+    liberar = threading.Event()
+    colecao = ColecaoRegistrada(liberar)
+    escritor = criar_escritor(colecao, tamanho_lote=1, intervalo=0.01, max_buffer=1, espera=0.05)
+    escritor.enfileirar({"i": 0})
+    # A thread fica presa gravando o primeiro documento; o segundo ocupa a fila e o terceiro não cabe
+    assert colecao.iniciado.wait(5)
+    escritor.enfileirar({"i": 1})
+    escritor.enfileirar({"i": 2})
+    assert escritor.escritas_sincronas == 1
+    assert colecao.count_documents({"i": 2}) == 1
+    liberar.set()
+    escritor.descarregar()
+    assert colecao.count_documents({}) == 3
+
+def test_descarregar_grava_a_fila_e_o_lote_em_andamento():
+    liberar = threading.Event()
+    colecao = ColecaoRegistrada(liberar)
+    escritor = criar_escritor(colecao, tamanho_lote=2, intervalo=0.01)
+    for i in range(2):
+        escritor.enfileirar({"i": i})
+    # Lote já retirado da fila pela thread, ainda sem gravar, e mais documentos na fila
+    assert colecao.iniciado.wait(5)
+    for i in range(2, 5):
+        escritor.enfileirar({"i": i})
+    threading.Timer(0.1, liberar.set).start()
+    escritor.descarregar()
+    assert colecao.count_documents({}) == 5
+    assert escritor.escritos == 5
+    assert escritor.pendentes() == 0
+
+def test_falha_na_gravacao_e_contabilizada():
+    class ColecaoIndisponivel(ColecaoMemoria):
+        def insert_many(self, documentos, ordered=True):
+            raise ConnectionError("sem conexão")
+
+    escritor = criar_escritor(ColecaoIndisponivel(), intervalo=0.01)
+    for i in range(3):
+        escritor.enfileirar({"i": i})
+    escritor.descarregar()
+    assert escritor.falhas == 3
+    assert escritor.escritos == 0
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from services.model_service import limitar_nao_negativas, prever_intervalos
+
+
+def serie_seca():
+    # Chuva quase sempre zero e vento fraco: o intervalo simétrico passaria de 0 para baixo
+    datas = pd.date_range('2010-01-01', periods=120, freq='MS')
+    gerador = np.random.default_rng(0)
+    return pd.DataFrame({
+        'tavg': 20 + 5 * np.sin(2 * np.pi * np.arange(120) / 12) + gerador.normal(0, 1, 120),
+        'prcp': np.where(gerador.random(120) < 0.8, 0.0, gerador.exponential(20, 120)),
+        'wspd': np.abs(gerador.normal(1, 2, 120)),
+    }, index=datas)
+
+def test_chuva_e_vento_nao_ficam_negativos():
+    previsoes = prever_intervalos(serie_seca(), ['tavg', 'prcp', 'wspd'], pd.date_range('2020-01-01', periods=12, freq='MS'), modelo='harmonico')
+    for coluna in ('prcp', 'wspd'):
+        for chave in ('yhat', 'inferior', 'superior'):
+            assert min(previsoes[coluna][chave]) >= 0.0
+    # Temperatura não é cortada
+    assert min(previsoes['tavg']['inferior']) < min(previsoes['tavg']['yhat'])
+
+def test_corte_igual_para_qualquer_motor():
+    previsoes = limitar_nao_negativas({
+        'prcp': {'yhat': np.array([-1.0, 3.0]), 'inferior': np.array([-5.0, -1.0]), 'superior': np.array([2.0, 7.0])},
+        'tmin': {'yhat': np.array([-3.0]), 'inferior': np.array([-6.0]), 'superior': np.array([0.5])},
+    })
+    assert previsoes['prcp']['yhat'].tolist() == [0.0, 3.0]
+    assert previsoes['prcp']['inferior'].tolist() == [0.0, 0.0]
+    assert previsoes['prcp']['superior'].tolist() == [2.0, 7.0]
+    assert previsoes['tmin']['yhat'].tolist() == [-3.0]
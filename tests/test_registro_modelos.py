@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import COLUNAS_CLIMA
+from services.registro_modelos import RegistroModelos
+
+
+def serie(meses):
+    datas = pd.date_range('2020-01-01', periods=meses, freq='MS', name='date')
+    return pd.DataFrame(np.ones((meses, len(COLUNAS_CLIMA)), dtype='float32'), index=datas, columns=COLUNAS_CLIMA)
+
+def treinar_fixo(df, colunas, parametros):
+    return b'x' * 1000
+
+
+def test_registro_descarta_modelos_antigos_do_disco(tmp_path):
+    registro = RegistroModelos(str(tmp_path / "modelos"), 8, max_bytes=3 * 1024)
+    for i in range(10):
+        registro.obter(serie(12 + i), COLUNAS_CLIMA, {}, treinar_fixo)
+    arquivos = os.listdir(tmp_path / "modelos")
+    assert len(arquivos) == 3
+    assert sum(os.path.getsize(tmp_path / "modelos" / arquivo) for arquivo in arquivos) <= 3 * 1024
+
+def test_falha_no_treino_libera_o_lock_da_impressao(tmp_path):
+    def treinar_com_falha(df, colunas, parametros):
+        raise ValueError("falha no ajuste")
+
+    registro = RegistroModelos(str(tmp_path / "modelos"), 8)
+    with pytest.raises(ValueError):
+        registro.obter(serie(12), COLUNAS_CLIMA, {}, treinar_com_falha)
+    assert registro._locks_treino == {}
+    assert registro.obter(serie(12), COLUNAS_CLIMA, {}, treinar_fixo) == b'x' * 1000
@@ -0,0 +1,72 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from config import AGENDADOR_AEROPORTOS, AGENDADOR_CELULAS, AGENDADOR_HORIZONTE_DIAS, AGENDADOR_INTERVALO_SEGUNDOS, AGENDADOR_CONCORRENCIA
+from services.aeroapi_service import obter_coordenadas_aeroporto
+from services.previsao_service import prever_local
+from services.previsao_store import armazem_previsoes
+
+logger = logging.getLogger('agendador')
+
+def locais_configurados():
+    locais = []
+    for codigo in AGENDADOR_AEROPORTOS:
+        try:
+            lat, lon = obter_coordenadas_aeroporto(codigo)
+            locais.append((codigo, lat, lon))
+        except Exception as e:
+            logger.error("Aeroporto %s ignorado: %s", codigo, e)
+    for par in AGENDADOR_CELULAS.split(';'):
+        if par.strip():
+            lat, lon = (float(valor) for valor in par.split(','))
+            locais.append((par.strip(), lat, lon))
+    return locais
+
+def horizonte(dias):
+    hoje = date.today()
+    return [(hoje + timedelta(days=i)).isoformat() for i in range(dias + 1)]
+
+def atualizar_local(nome, lat, lon, datas):
+    # Incremental: só recalcula as datas ausentes ou vencidas no armazém
+    frescas = armazem_previsoes.datas_frescas(lat, lon, datas)
+    pendentes = [data for data in datas if data not in frescas]
+    if pendentes:
+        armazem_previsoes.salvar(lat, lon, prever_local(lat, lon, pendentes))
+    return len(pendentes)
+
+def executar_ciclo():
+    datas = horizonte(AGENDADOR_HORIZONTE_DIAS)
+    locais = locais_configurados()
+    inicio = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=AGENDADOR_CONCORRENCIA, thread_name_prefix='agendador') as executor:
+        futuros = {executor.submit(atualizar_local, nome, lat, lon, datas): nome for nome, lat, lon in locais}
+        for futuro in as_completed(futuros):
+            nome = futuros[futuro]
+            try:
+                logger.info("%s: %d previsões atualizadas", nome, futuro.result())
+            except Exception as e:
+                logger.error("%s: falha ao atualizar previsões: %s", nome, e)
+
+    armazem_previsoes.remover_antigas(datas[0])
+    logger.info("Ciclo concluído em %.1fs para %d locais", time.perf_counter() - inicio, len(locais))
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-calcula previsões dos aeroportos e células configurados.")
+    parser.add_argument('--uma-vez', action='store_true', help="Executa um único ciclo e encerra (uso com cron).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    while True:
+        inicio = time.monotonic()
+        executar_ciclo()
+        if args.uma_vez:
+            return
+        time.sleep(max(0.0, AGENDADOR_INTERVALO_SEGUNDOS - (time.monotonic() - inicio)))
+
+if __name__ == '__main__':
+    main()
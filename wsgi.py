@@ -0,0 +1,24 @@
+import importlib
+
+from app import create_app
+from services.executores import reiniciar_executores
+from services.http_client import cliente_http
+from services.model_service import descartar_executor
+from services.mongo_service import reiniciar_conexao
+
+# Bibliotecas pesadas importadas no processo mestre (preload) e compartilhadas copy-on-write pelos workers
+MODULOS_PRECARREGADOS = ['prophet', 'sklearn.ensemble', 'matplotlib.figure', 'matplotlib.backends.backend_agg', 'seaborn', 'folium', 'openpyxl']
+
+def precarregar():
+    for modulo in MODULOS_PRECARREGADOS:
+        importlib.import_module(modulo)
+
+def reiniciar_recursos():
+    # Executado em cada worker após o fork: pools, sessões HTTP e conexões não sobrevivem ao fork
+    reiniciar_executores()
+    descartar_executor(encerrar=False)
+    cliente_http.reiniciar()
+    reiniciar_conexao()
+
+precarregar()
+app = create_app()